@@ -0,0 +1,157 @@
+"""
+__author__ = "Paul Waldecker"
+__email__ = "0157@htl.rennweg.at"
+__version__ = "1.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Ready to Review"
+"""
+import argparse
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import rsa
+
+try:
+    from gmpy2 import mpz
+except ImportError:  # ohne gmpy2 wird mit int gerechnet; Division großer int ist in CPython quadratisch
+    mpz = int
+
+# Ebenen mit weniger Knoten werden ohne Prozesspool gerechnet, der Transport der Zahlen wäre teurer
+PARALLEL_MIN_NODES = 64
+
+
+def pair_product(pair):
+    """
+    Produkt eines Knotenpaars im Produktbaum (ein einzelner Knoten bleibt unverändert).
+    :param pair: Tupel mit einem oder zwei Faktoren
+    :return: Produkt
+    >>> pair_product((3, 5)), pair_product((7,))
+    (15, 7)
+    """
+    return math.prod(pair)
+
+
+def child_remainder(task):
+    """
+    Rest eines Knotens im Restbaum: Rest des Elternknotens modulo Quadrat des Knotens.
+    :param task: (Rest des Elternknotens, Knoten)
+    :return: Rest
+    >>> child_remainder((100, 3))
+    1
+    """
+    remainder, node = task
+    return remainder % (node * node)
+
+
+def level_map(func, items, pool):
+    """
+    Wendet func auf alle Knoten einer Baumebene an, bei großen Ebenen im Prozesspool.
+    :param func: Funktion auf Modulebene
+    :param items: Knoten der Ebene
+    :param pool: ProcessPoolExecutor oder None
+    :return: Liste der Ergebnisse
+    """
+    if pool is None or len(items) < PARALLEL_MIN_NODES:
+        return list(map(func, items))
+    return list(pool.map(func, items, chunksize=max(1, len(items) // PARALLEL_MIN_NODES)))
+
+
+def product_tree(numbers, pool=None):
+    """
+    Produktbaum: unterste Ebene sind die Zahlen, jede Ebene darüber die paarweisen Produkte der Ebene darunter.
+    :param numbers: Liste von Zahlen
+    :param pool: ProcessPoolExecutor oder None
+    :return: Liste der Ebenen, die letzte enthält nur das Produkt aller Zahlen
+    >>> [[int(n) for n in level] for level in product_tree([2, 3, 5, 7, 11])]
+    [[2, 3, 5, 7, 11], [6, 35, 11], [210, 11], [2310]]
+    """
+    tree = [list(numbers)]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        tree.append(level_map(pair_product, [tuple(level[i:i + 2]) for i in range(0, len(level), 2)], pool))
+    return tree
+
+
+def batch_gcd(numbers, jobs=1):
+    """
+    Batch-GCD nach Bernstein: berechnet für jede Zahl n_i ggt(n_i, Produkt aller anderen Zahlen) über einen Produkt-
+    und einen Restbaum in quasi-linearer Zeit statt mit paarweisen ggt-Aufrufen.
+    :param numbers: Liste von Zahlen (z.B. RSA-Moduli)
+    :param jobs: Anzahl der Prozesse für die Baumebenen
+    :return: Liste der ggt-Werte; ein Wert größer 1 bedeutet einen gemeinsamen Faktor mit einer anderen Zahl
+    >>> batch_gcd([3 * 5, 7 * 11, 5 * 13, 17 * 19])
+    [5, 1, 5, 1]
+    >>> batch_gcd([6])
+    [1]
+    """
+    if len(numbers) < 2:
+        return [1] * len(numbers)
+
+    numbers = [mpz(n) for n in numbers]
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        tree = product_tree(numbers, pool)
+        remainders = tree.pop()
+        while tree:
+            level = tree.pop()
+            remainders = level_map(child_remainder, [(remainders[i // 2], n) for i, n in enumerate(level)], pool)
+    finally:
+        if pool:
+            pool.shutdown()
+    return [int(math.gcd(r // n, n)) for r, n in zip(remainders, numbers)]
+
+
+def load_moduli(directory):
+    """
+    Liest die Moduli aller Schlüsseldateien (*.pem) eines Verzeichnisses. Dateien, die sich nicht als Schlüssel laden
+    lassen, werden übersprungen.
+    :param directory: Verzeichnis mit Schlüsseldateien
+    :return: Dictionary Modul -> Liste der Dateinamen
+    """
+    moduli = {}
+    for filename in sorted(Path(directory).rglob("*.pem")):
+        try:
+            key = rsa.load_key(filename)
+        except Exception as e:
+            logging.warning(f"{filename} übersprungen: {e}")
+            continue
+        moduli.setdefault(key[1], []).append(filename)
+    return moduli
+
+
+def audit(directory, jobs=1):
+    """
+    Sucht in einem Verzeichnis von Schlüsseln Moduli mit gemeinsamen Primfaktoren. Dateien mit demselben Modul
+    (öffentlicher und privater Schlüssel eines Paares) zählen als ein Modul.
+    :param directory: Verzeichnis mit Schlüsseldateien
+    :param jobs: Anzahl der Prozesse
+    :return: Liste von (Modul, gefundener Faktor, Dateinamen)
+    """
+    moduli = load_moduli(directory)
+    numbers = list(moduli)
+    logging.info(f"{len(numbers)} verschiedene Moduli in {directory}")
+    return [(n, g, moduli[n]) for n, g in zip(numbers, batch_gcd(numbers, jobs)) if g != 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="batch_gcd.py by Paul Waldecker -- find RSA keys with shared primes")
+    parser.add_argument("directory", help="directory with saved keys (*.pem)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes, default=1")
+    parser.add_argument("-v", "--verbosity", help="increase output verbosity", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbosity else logging.WARNING)
+
+    weak = audit(args.directory, args.jobs)
+    for n, g, filenames in weak:
+        factor = "shares a factor" if g == n else f"shares factor {g}"
+        print(f"{', '.join(map(str, filenames))}: {factor}")
+    if not weak:
+        print("No shared factors found")
+
+
+if __name__ == "__main__":
+    main()
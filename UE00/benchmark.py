@@ -0,0 +1,223 @@
+"""
+__author__ = "Paul Waldecker"
+__email__ = "0157@htl.rennweg.at"
+__version__ = "1.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Ready to Review"
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import miller_rabin
+import rsa
+from pow import pow_iterativ, pow_kary, pow_sliding
+
+# Standard-Bitlängen und Wiederholungen
+BITS = [64, 128, 256, 512, 1024, 2048, 4096]
+WARMUP = 1
+REPEAT = 5
+# Größe der Testdatei für den Durchsatz von encryptFile/decryptFile
+FILE_SIZE = 64 * 1024
+# Erlaubte Verschlechterung des Medians gegenüber der Vergleichsdatei
+THRESHOLD = 0.2
+# Namen aller Operationen von operations, in Ausgabereihenfolge
+OPERATIONS = ["pow_iterativ", "pow_kary", "pow_sliding", "pow", "is_prim_millerrabin", "is_prim", "generate_prime",
+              "generate_keys", "encryptFile", "decryptFile"]
+
+
+def percentile(values, q):
+    """
+    Perzentil mit linearer Interpolation.
+    :param values: Messwerte
+    :param q: Perzentil zwischen 0 und 100
+    :return: Perzentil der Messwerte
+    >>> percentile([1, 2, 3, 4], 50)
+    2.5
+    >>> percentile([5], 90)
+    5.0
+    """
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(times, size=None):
+    """
+    Fasst die Laufzeiten einer Messreihe zusammen.
+    :param times: Laufzeiten in Sekunden
+    :param size: verarbeitete Bytes pro Lauf (für den Durchsatz), sonst None
+    :return: Dictionary mit Median, Perzentilen, Minimum und Maximum
+    >>> summarize([1.0, 2.0, 3.0])["median"]
+    2.0
+    >>> summarize([0.5], 1000)["bytes_per_s"]
+    2000.0
+    """
+    result = {
+        "runs": len(times),
+        "median": statistics.median(times),
+        "p10": percentile(times, 10),
+        "p90": percentile(times, 90),
+        "min": min(times),
+        "max": max(times),
+    }
+    if size is not None:
+        result["bytes_per_s"] = size / result["median"]
+    return result
+
+
+def measure(func, warmup=WARMUP, repeat=REPEAT):
+    """
+    Misst die Laufzeit von func nach warmup Aufwärmläufen repeat mal.
+    :param func: Funktion ohne Parameter
+    :param warmup: Anzahl der nicht gewerteten Läufe
+    :param repeat: Anzahl der gemessenen Läufe
+    :return: Liste der Laufzeiten in Sekunden
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    return times
+
+
+def operations(bits, workdir, names=None):
+    """
+    Erzeugt die zu messenden Operationen für eine Bitlänge. Testdaten werden mit festem Seed erzeugt, damit Läufe
+    vergleichbar sind. Teure Vorbereitungen (Primzahl, Schlüsselpaar, Testdateien) laufen nur, wenn eine der
+    Operationen, die sie brauchen, ausgewählt ist.
+    :param bits: Bitlänge
+    :param workdir: Verzeichnis für die Testdateien
+    :param names: Namen der Operationen, None für alle
+    :return: Dictionary Name -> (Funktion, verarbeitete Bytes oder None)
+    """
+    def selected(*candidates):
+        return not names or any(name in names for name in candidates)
+
+    rng = random.Random(bits)
+    m = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+    b = rng.randrange(2, m)
+    e = rng.getrandbits(bits) | (1 << (bits - 1))
+    ops = {
+        "pow_iterativ": (lambda: pow_iterativ(b, e, m), None),
+        "pow_kary": (lambda: pow_kary(b, e, m), None),
+        "pow_sliding": (lambda: pow_sliding(b, e, m), None),
+        "pow": (lambda: pow(b, e, m), None),
+    }
+
+    if selected("is_prim_millerrabin", "is_prim"):
+        prime = miller_rabin.generate_prime(bits)
+        ops["is_prim_millerrabin"] = (lambda: miller_rabin.is_prim_millerrabin(prime), None)
+        ops["is_prim"] = (lambda: miller_rabin.is_prim(prime), None)
+    ops["generate_prime"] = (lambda: miller_rabin.generate_prime(bits), None)
+    ops["generate_keys"] = (lambda: rsa.generate_keys(bits), None)
+
+    if selected("encryptFile", "decryptFile"):
+        public_key, private_key = rsa.generate_keys(bits)
+        clearfile = Path(workdir) / f"clear_{bits}.bin"
+        cryptfile = Path(workdir) / f"crypt_{bits}.bin"
+        outfile = Path(workdir) / f"out_{bits}.bin"
+        clearfile.write_bytes(rng.randbytes(FILE_SIZE))
+        rsa.encryptFile(clearfile, cryptfile, public_key)
+        ops["encryptFile"] = (lambda: rsa.encryptFile(clearfile, outfile, public_key), FILE_SIZE)
+        ops["decryptFile"] = (lambda: rsa.decryptFile(cryptfile, outfile, private_key), FILE_SIZE)
+
+    return {name: op for name, op in ops.items() if selected(name)}
+
+
+def run(bits_list, names=None, warmup=WARMUP, repeat=REPEAT):
+    """
+    Führt alle (oder die ausgewählten) Operationen für alle Bitlängen aus.
+    :param bits_list: Liste von Bitlängen
+    :param names: Namen der Operationen, None für alle
+    :param warmup: Anzahl der Aufwärmläufe
+    :param repeat: Anzahl der gemessenen Läufe
+    :return: Ergebnis als Dictionary (JSON-serialisierbar)
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for bits in bits_list:
+            for name, (func, size) in operations(bits, workdir, names).items():
+                summary = summarize(measure(func, warmup, repeat), size)
+                results.setdefault(name, {})[str(bits)] = summary
+                logging.info(f"{name} {bits} Bits: Median {summary['median'] * 1000:.3f} ms")
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def regressions(current, baseline, threshold=THRESHOLD):
+    """
+    Vergleicht die Mediane mit einer früheren Messung.
+    :param current: aktuelles Ergebnis von run
+    :param baseline: früheres Ergebnis von run
+    :param threshold: erlaubte relative Verschlechterung
+    :return: Liste von (Operation, Bits, alter Median, neuer Median) für alle Verschlechterungen über threshold
+    >>> old = {"results": {"pow": {"64": {"median": 1.0}}}}
+    >>> regressions({"results": {"pow": {"64": {"median": 1.5}}}}, old)
+    [('pow', '64', 1.0, 1.5)]
+    >>> regressions({"results": {"pow": {"64": {"median": 1.1}}}}, old)
+    []
+    """
+    found = []
+    for name, by_bits in current["results"].items():
+        for bits, summary in by_bits.items():
+            old = baseline["results"].get(name, {}).get(bits)
+            if old and summary["median"] > old["median"] * (1 + threshold):
+                found.append((name, bits, old["median"], summary["median"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark.py by Paul Waldecker -- timings for the UE00 primitives")
+    parser.add_argument("-b", "--bits", type=int, nargs="+", default=BITS, help=f"bit sizes, default={BITS}")
+    parser.add_argument("-o", "--ops", nargs="+", choices=OPERATIONS, metavar="OP",
+                        help=f"only run these operations: {', '.join(OPERATIONS)}")
+    parser.add_argument("-w", "--warmup", type=int, default=WARMUP, help=f"warmup runs, default={WARMUP}")
+    parser.add_argument("-r", "--repeat", type=int, default=REPEAT, help=f"measured runs, default={REPEAT}")
+    parser.add_argument("-s", "--json", help="write the results to this JSON file")
+    parser.add_argument("-c", "--compare", help="compare the medians with this earlier JSON result")
+    parser.add_argument("-t", "--threshold", type=float, default=THRESHOLD,
+                        help=f"allowed relative slowdown against --compare, default={THRESHOLD}")
+    parser.add_argument("-v", "--verbosity", help="increase output verbosity", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbosity else logging.WARNING)
+
+    result = run(args.bits, args.ops, args.warmup, args.repeat)
+    output = json.dumps(result, indent=2)
+    if args.json:
+        Path(args.json).write_text(output)
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        found = regressions(result, baseline, args.threshold)
+        for name, bits, old, new in found:
+            print(f"Regression: {name} {bits} Bits: {old * 1000:.3f} ms -> {new * 1000:.3f} ms", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
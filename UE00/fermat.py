@@ -6,7 +6,25 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Ready to Review"
 """
+import argparse
+import math
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import miller_rabin
+
+try:
+    import numpy as np
+except ImportError:  # ohne NumPy wird mit pow in Python gerechnet
+    np = None
+
+# Anzahl der Basen bzw. Kandidaten, die auf einmal als NumPy-Array verarbeitet werden
+CHUNK_SIZE = 1 << 20
+# Unter dieser Grenze passt das Produkt zweier Reste in uint64
+DIRECT_LIMIT = 1 << 32
+# Bis zu dieser Grenze wird vektorisiert gerechnet; darüber wird der Quotient über long double geschätzt, das geht nur
+# mit 64 Bit Mantisse (x86), sonst nur bis DIRECT_LIMIT
+NUMPY_LIMIT = 1 << 62 if np is not None and np.finfo(np.longdouble).nmant >= 63 else DIRECT_LIMIT
 
 
 def fermat(p):
@@ -30,6 +48,85 @@ def fermat(p):
     return [pow(a, p - 1, p) for a in range(1, p)]
 
 
+def fermat_iter(p):
+    """
+    Wie fermat, liefert die Ergebnisse aber einzeln, ohne die Liste aufzubauen.
+    :param p: Zahl, die getestet werden soll
+    :return: Generator für a^(p-1) mod p mit a von 1 bis p-1
+    >>> list(fermat_iter(5))
+    [1, 1, 1, 1]
+    """
+    return (pow(a, p - 1, p) for a in range(1, p))
+
+
+def mulmod(a, b, m):
+    """
+    Elementweise a * b mod m für uint64-Arrays mit Werten kleiner m < NUMPY_LIMIT. Ab DIRECT_LIMIT wird der Quotient
+    über long double geschätzt und der Rest in 64-Bit-Arithmetik korrigiert.
+    :param a: Faktoren
+    :param b: Faktoren
+    :param m: Modulo (Zahl oder Array)
+    :return: a * b mod m als uint64-Array
+    >>> [int(x) for x in mulmod(np.array([3, 2 ** 61], dtype=np.uint64), np.array([5, 2 ** 61 - 3], dtype=np.uint64),
+    ...                         2 ** 61 + 1)] == [15, 2 ** 61 * (2 ** 61 - 3) % (2 ** 61 + 1)]
+    True
+    """
+    m = np.asarray(m, dtype=np.uint64)
+    if m.max() < DIRECT_LIMIT:
+        return a * b % m
+    q = (a.astype(np.longdouble) * b / m).astype(np.uint64)
+    r = (a * b - q * m).astype(np.int64)
+    signed_m = m.astype(np.int64)
+    r = np.where(r < 0, r + signed_m, r)
+    r = np.where(r >= signed_m, r - signed_m, r)
+    return r.astype(np.uint64)
+
+
+def powmod(bases, exponents, m):
+    """
+    Elementweise bases^exponents mod m mit NumPy (Square-and-Multiply über alle Elemente gleichzeitig).
+    :param bases: uint64-Array der Basen
+    :param exponents: Exponent (Zahl) oder Array der Exponenten
+    :param m: Modulo (Zahl oder Array), kleiner NUMPY_LIMIT
+    :return: uint64-Array der Ergebnisse
+    >>> powmod(np.arange(1, 6, dtype=np.uint64), 4, 5).tolist()
+    [1, 1, 1, 1, 0]
+    >>> powmod(np.array([2, 2], dtype=np.uint64), np.array([340, 560]), np.array([341, 561])).tolist()
+    [1, 1]
+    """
+    exponents = np.asarray(exponents, dtype=np.uint64)
+    m = np.asarray(m, dtype=np.uint64)
+    base = bases % m
+    result = np.ones_like(base)
+    for bit in range(int(exponents.max()).bit_length()):
+        mask = ((exponents >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        result = np.where(mask, mulmod(result, base, m), result)
+        base = mulmod(base, base, m)
+    return result % m
+
+
+def count_ones(p, use_numpy=True):
+    """
+    Zählt, für wie viele a von 1 bis p-1 a^(p-1) mod p = 1 gilt, ohne die Ergebnisse zu speichern. Für p kleiner
+    NUMPY_LIMIT wird in Blöcken von CHUNK_SIZE Basen mit NumPy gerechnet.
+    :param p: Zahl, die getestet werden soll
+    :param use_numpy: NumPy verwenden, falls vorhanden
+    :return: Anzahl der Einsen
+    >>> count_ones(7), count_ones(10), count_ones(561)
+    (6, 1, 320)
+    >>> count_ones(561, use_numpy=False)
+    320
+    """
+    if not (use_numpy and np is not None and p < NUMPY_LIMIT):
+        return sum(1 for value in fermat_iter(p) if value == 1)
+
+    ones = 0
+    for start in range(1, p, CHUNK_SIZE):
+        bases = np.arange(start, min(start + CHUNK_SIZE, p), dtype=np.uint64)
+        ones += int(np.count_nonzero(powmod(bases, p - 1, p) == 1 % p))
+    return ones
+
+
 def display(values, p):
     """
     Anzeige der Ergebnisse in Prozent und Anzahl der 1en in der Liste
@@ -48,7 +145,121 @@ def display(values, p):
           f" len(res)={total} - {list(counter.items())}")
 
 
-if __name__ == "__main__":
+def display_count(p, use_numpy=True):
+    """
+    Anzeige wie display, aber mit count_ones statt der Liste (ohne Verteilung der übrigen Ergebnisse).
+    :param p: Zahl, die getestet werden soll
+    :param use_numpy: NumPy verwenden, falls vorhanden
+    >>> display_count(7)
+    7 -> 100.00 % -> res[1]=6, len(res)=6
+    >>> display_count(10)
+    10 -> 11.11 % -> res[1]=1, len(res)=9
+    """
+    ones = count_ones(p, use_numpy)
+    total = p - 1
+    percentage = ones / total * 100 if total else 0
+    print(f"{p} -> {percentage:.2f} % -> res[1]={ones}, len(res)={total}")
+
+
+def is_carmichael(n, primes):
+    """
+    Korselt-Kriterium: n ist eine Carmichael-Zahl, wenn n zusammengesetzt und quadratfrei ist und p-1 ein Teiler von
+    n-1 für jeden Primfaktor p ist.
+    :param n: ungerade Zahl
+    :param primes: Primzahlen bis mindestens isqrt(n)
+    :return: True, wenn n eine Carmichael-Zahl ist
+    >>> primes = miller_rabin.small_primes(100)
+    >>> [n for n in (561, 563, 1105, 2047, 6601, 8911) if is_carmichael(n, primes)]
+    [561, 1105, 6601, 8911]
+    """
+    rest = n
+    factors = []
+    for p in primes:
+        if p * p > rest:
+            break
+        if rest % p == 0:
+            rest //= p
+            if rest % p == 0:
+                return False
+            factors.append(p)
+    if rest > 1:
+        factors.append(rest)
+    return len(factors) > 1 and all((n - 1) % (p - 1) == 0 for p in factors)
+
+
+def scan_range(start, stop):
+    """
+    Sucht im Bereich [start, stop) alle ungeraden zusammengesetzten Zahlen n mit 2^(n-1) mod n = 1 (2 ist dann ein
+    Fermat-Lügner für n) und darunter die Carmichael-Zahlen, für die jede teilerfremde Basis lügt. Zusammengesetzte
+    Zahlen werden mit einem Segmentsieb gefunden.
+    :param start: Anfang des Bereichs
+    :param stop: Ende des Bereichs (exklusiv)
+    :return: (Fermat-Pseudoprimzahlen zur Basis 2, Carmichael-Zahlen)
+    >>> scan_range(3, 3000)
+    ([341, 561, 645, 1105, 1387, 1729, 1905, 2047, 2465, 2701, 2821], [561, 1105, 1729, 2465, 2821])
+    """
+    start = max(start, 3) | 1
+    if start >= stop:
+        return [], []
+    primes = miller_rabin.small_primes(math.isqrt(stop) + 2)
+    size = len(range(start, stop, 2))
+    composite = bytearray(size)
+    for p in primes[1:]:
+        first = max(p * p, (start + p - 1) // p * p)
+        if first % 2 == 0:
+            first += p
+        index = (first - start) // 2
+        if index < size:
+            composite[index::p] = b"\x01" * len(range(index, size, p))
+
+    if np is not None and stop < NUMPY_LIMIT:
+        numbers = np.arange(start, stop, 2, dtype=np.uint64)[np.frombuffer(composite, dtype=np.uint8) == 1]
+        twos = np.full(len(numbers), 2, dtype=np.uint64)
+        liars = numbers[powmod(twos, numbers - np.uint64(1), numbers) == 1].tolist() if len(numbers) else []
+    else:
+        liars = [n for i, n in enumerate(range(start, stop, 2)) if composite[i] and pow(2, n - 1, n) == 1]
+    return liars, [n for n in liars if is_carmichael(n, primes)]
+
+
+def scan(start, stop, jobs=1, chunk=CHUNK_SIZE):
+    """
+    Wie scan_range, aber in Blöcken von chunk Zahlen, die mit jobs Prozessen parallel durchsucht werden.
+    :param start: Anfang des Bereichs
+    :param stop: Ende des Bereichs (exklusiv)
+    :param jobs: Anzahl der Prozesse
+    :param chunk: Zahlen pro Block
+    :return: (Fermat-Pseudoprimzahlen zur Basis 2, Carmichael-Zahlen)
+    >>> scan(3, 10000, chunk=1000)[1]
+    [561, 1105, 1729, 2465, 2821, 6601, 8911]
+    """
+    starts = range(start, stop, chunk)
+    stops = [min(s + chunk, stop) for s in starts]
+    if jobs <= 1:
+        results = list(map(scan_range, starts, stops))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(scan_range, starts, stops))
+    return [n for liars, _ in results for n in liars], [n for _, carmichaels in results for n in carmichaels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fermat.py by Paul Waldecker -- Fermat test statistics")
+    parser.add_argument("-c", "--count", type=int, nargs="+", help="count the Fermat ones for these numbers")
+    parser.add_argument("-s", "--scan", type=int, nargs=2, metavar=("START", "STOP"),
+                        help="find base-2 Fermat pseudoprimes and Carmichael numbers in [START, STOP)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes for --scan, default=1")
+    args = parser.parse_args()
+
+    if args.count:
+        for p in args.count:
+            display_count(p)
+    if args.scan:
+        liars, carmichaels = scan(*args.scan, jobs=args.jobs)
+        print(f"{len(liars)} Fermat-Pseudoprimzahlen zur Basis 2, {len(carmichaels)} Carmichael-Zahlen")
+        print(f"Carmichael-Zahlen: {carmichaels}")
+    if args.count or args.scan:
+        return
+
     primes = list(range(2, 12)) + [997]
     maybe_primes = [9, 15, 21, 551, 552, 553, 554, 555, 556, 557, 558, 559, 560, 561, 562,
                     563, 564, 565, 566, 567, 568, 569, 6601, 8911]
@@ -60,3 +271,7 @@ if __name__ == "__main__":
     print("\nErgebnisse für Nicht-Primzahlen:")
     for p in maybe_primes:
         display(fermat(p), p)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,11 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Ready to Review"
 """
+import bisect
+import math
+import multiprocessing
 import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 # Globale variable für die ersten 100 Primzahlen
 FIRST_100_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29,
@@ -20,6 +24,50 @@ FIRST_100_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29,
                     419, 421, 431, 433, 439, 443, 449, 457, 461, 463,
                     467, 479, 487, 491, 499, 503, 509, 521, 523, 541]
 
+# Minimale deterministische Basen für Miller-Rabin: (obere Schranke, Basen), gültig für n < Schranke
+DETERMINISTIC_BASES = [(2047, (2,)),
+                       (1373653, (2, 3)),
+                       (25326001, (2, 3, 5)),
+                       (3215031751, (2, 3, 5, 7)),
+                       (2152302898747, (2, 3, 5, 7, 11)),
+                       (3474749660383, (2, 3, 5, 7, 11, 13)),
+                       (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+                       # 7 Basen nach Sinclair, gültig für alle n < 2^64 (statt 9 bzw. 12 Primzahlbasen)
+                       (1 << 64, (2, 325, 9375, 28178, 450775, 9780504, 1795265022)),
+                       (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37))]
+
+# Zusätzliche zufällige Miller-Rabin-Runden nach BPSW
+BPSW_EXTRA_ROUNDS = 0
+
+# Obergrenze der kleinen Primzahlen für das Sieb und Anzahl ungerader Kandidaten pro Fenster (Höchstwerte, siehe
+# window_params)
+SIEVE_LIMIT = 1 << 16
+WINDOW_SIZE = 4096
+
+
+def small_primes(limit):
+    """
+    Berechnet alle Primzahlen kleiner als limit mit dem Sieb des Eratosthenes.
+
+    :param limit: Obergrenze (exklusiv).
+    :return: Liste der Primzahlen kleiner als limit.
+    >>> small_primes(30)
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+    flags = bytearray([1]) * limit
+    flags[:2] = bytes(min(2, limit))
+    for p in range(2, math.isqrt(limit - 1) + 1):
+        if flags[p]:
+            flags[p * p::p] = bytes(len(range(p * p, limit, p)))
+    return [p for p in range(limit) if flags[p]]
+
+
+# Ungerade Primzahlen für das Kandidatensieb
+SIEVE_PRIMES = small_primes(SIEVE_LIMIT)[1:]
+
+# Stop-Signale der Worker-Prozesse von generate_primes_parallel, eines pro gesuchter Primzahl
+STOP_EVENTS = []
+
 
 def is_prim_millerrabin(n, k=20):
     """
@@ -67,12 +115,206 @@ def is_prim_millerrabin(n, k=20):
     return "probably prime"
 
 
-def is_prim(n):
+def is_strong_probable_prime(n, a):
+    """
+    Eine Runde des Miller-Rabin-Tests mit fester Basis a (starker Fermat-Test).
+
+    :param n: Die zu überprüfende ungerade Zahl, n > 2.
+    :param a: Basis des Tests.
+    :return: True, wenn n eine starke Pseudoprimzahl zur Basis a ist.
+    >>> is_strong_probable_prime(2047, 2)
+    True
+    >>> is_strong_probable_prime(2047, 3)
+    False
+    """
+    a %= n
+    if a == 0:
+        return True
+
+    r, d = 0, n - 1
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(r - 1):
+        x = pow(x, 2, n)
+        if x == n - 1:
+            return True
+    return False
+
+
+def is_prim_deterministic(n):
+    """
+    Deterministischer Miller-Rabin-Test für n < 318665857834031151167461 (deckt alle 64-Bit-Zahlen ab). Es werden
+    nur so viele feste Basen geprüft, wie für die Größe von n nötig sind (siehe DETERMINISTIC_BASES).
+
+    :param n: Die zu überprüfende Zahl.
+    :return: True, wenn die Zahl eine Primzahl ist, False sonst.
+    >>> is_prim_deterministic(3825123056546413051)
+    False
+    >>> is_prim_deterministic(2 ** 61 - 1)
+    True
+    """
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    for limit, bases in DETERMINISTIC_BASES:
+        if n < limit:
+            return all(is_strong_probable_prime(n, a) for a in bases)
+    raise ValueError(f"{n} ist zu groß für den deterministischen Test")
+
+
+def jacobi(a, n):
+    """
+    Berechnet das Jacobi-Symbol (a/n) für ungerades n > 0.
+
+    :param a: Zähler
+    :param n: Nenner, ungerade
+    :return: -1, 0 oder 1
+    >>> jacobi(5, 21)
+    1
+    >>> jacobi(2, 11)
+    -1
+    """
+    a %= n
+    result = 1
+    while a != 0:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def is_strong_lucas_prime(n):
+    """
+    Starker Lucas-Test mit den Parametern nach Selfridge (D aus 5, -7, 9, -11, ... mit (D/n) = -1, P = 1,
+    Q = (1 - D) / 4).
+
+    :param n: Die zu überprüfende ungerade Zahl, n > 2.
+    :return: True, wenn n eine starke Lucas-Pseudoprimzahl ist.
+    >>> is_strong_lucas_prime(5459)
+    True
+    >>> is_strong_lucas_prime(5461)
+    False
+    """
+    if math.isqrt(n) ** 2 == n:
+        return False
+
+    d = 5
+    while True:
+        j = jacobi(d, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d) != n:
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+    p, q = 1, (1 - d) // 4
+
+    k, s = n + 1, 0
+    while k % 2 == 0:
+        k //= 2
+        s += 1
+
+    def half(x):
+        # x / 2 modulo n (n ist ungerade)
+        return (x + n) // 2 % n if x % 2 else x // 2 % n
+
+    u, v, qk = 1, p, q % n
+    for bit in bin(k)[3:]:
+        u, v = u * v % n, (v * v - 2 * qk) % n
+        qk = qk * qk % n
+        if bit == "1":
+            u, v = half(p * u + v), half(d * u + p * v)
+            qk = qk * q % n
+
+    if u == 0 or v == 0:
+        return True
+    for _ in range(s - 1):
+        v = (v * v - 2 * qk) % n
+        if v == 0:
+            return True
+        qk = qk * qk % n
+    return False
+
+
+def is_prim_bpsw(n, extra_rounds=BPSW_EXTRA_ROUNDS):
+    """
+    Baillie-PSW-Test: ein starker Miller-Rabin-Test zur Basis 2 und ein starker Lucas-Test. Es ist keine Zahl
+    bekannt, die diesen Test besteht und zusammengesetzt ist. Optional folgen noch zufällige Miller-Rabin-Runden.
+
+    :param n: Die zu überprüfende Zahl.
+    :param extra_rounds: Anzahl zusätzlicher zufälliger Miller-Rabin-Runden.
+    :return: True, wenn die Zahl (wahrscheinlich) eine Primzahl ist, False sonst.
+    >>> is_prim_bpsw(2 ** 127 - 1)
+    True
+    >>> is_prim_bpsw(3825123056546413051)
+    False
+    """
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    if n == 3:
+        return True
+    if not is_strong_probable_prime(n, 2) or not is_strong_lucas_prime(n):
+        return False
+    return all(is_strong_probable_prime(n, random.randint(2, n - 2)) for _ in range(extra_rounds))
+
+
+def is_prim_auto(n):
+    """
+    Wählt den günstigsten Test: deterministischer Miller-Rabin für n < 2^64, sonst Baillie-PSW.
+
+    :param n: Die zu überprüfende Zahl.
+    :return: True, wenn die Zahl eine Primzahl ist, False sonst.
+    >>> is_prim_auto(24566544301293587)
+    True
+    >>> is_prim_auto(2 ** 89 - 1)
+    True
+    """
+    if n < 1 << 64:
+        return is_prim_deterministic(n)
+    return is_prim_bpsw(n)
+
+
+def is_prim_millerrabin_bool(n):
+    """
+    Adapter für is_prim_millerrabin, der wie die übrigen Primzahltests einen Wahrheitswert liefert. Die
+    Sonderfälle 2 und 3 gibt is_prim_millerrabin bereits als True zurück.
+
+    :param n: Die zu überprüfende Zahl.
+    :return: True, wenn die Zahl wahrscheinlich eine Primzahl ist, False sonst.
+    >>> [n for n in range(12) if is_prim_millerrabin_bool(n)]
+    [2, 3, 5, 7, 11]
+    """
+    return is_prim_millerrabin(n) in (True, "probably prime")
+
+
+# Auswählbare Primzahltests für is_prim und generate_prime
+ENGINES = {
+    "auto": is_prim_auto,
+    "deterministic": is_prim_deterministic,
+    "bpsw": is_prim_bpsw,
+    "millerrabin": is_prim_millerrabin_bool,
+}
+
+
+def is_prim(n, engine="auto"):
     """
     Überprüft, ob die gegebene Zahl eine Primzahl ist. Indem sie sie durch die ersten 100 Primzahlen teilt und den
-    Miller-Rabin-Test anwendet.
+    gewählten Primzahltest (siehe ENGINES) anwendet.
 
     :param n: Die zu überprüfende Zahl.
+    :param engine: Name des Primzahltests: "auto", "deterministic", "bpsw" oder "millerrabin".
     :return: True, wenn die Zahl eine Primzahl ist, False sonst.
     >>> is_prim(2)
     True
@@ -84,19 +326,97 @@ def is_prim(n):
     False
     >>> is_prim(643)
     True
+    >>> is_prim(643, engine="millerrabin")
+    True
     """
+    if n < 2:
+        return False
     for p in FIRST_100_PRIMES:
         if n % p == 0:
             return n == p
-    return is_prim_millerrabin(n) == "probably prime"
+    return ENGINES[engine](n)
+
+
+def window_params(bits):
+    """
+    Wählt Fenstergröße und Siebgrenze passend zur Bitlänge der Kandidaten. Der Abstand zwischen Primzahlen wächst
+    nur etwa mit bits * ln 2, ein Primzahltest ist für kleine Zahlen billiger als das Streichen mit allen
+    SIEVE_PRIMES; kleine Zahlen bekommen daher ein kurzes Fenster und wenige Siebprimzahlen.
+
+    :param bits: Bitlänge der Kandidaten.
+    :return: (Anzahl ungerader Kandidaten pro Fenster, Obergrenze der Siebprimzahlen)
+    >>> window_params(32)
+    (128, 1024)
+    >>> window_params(1024)
+    (4096, 65536)
+    """
+    return min(WINDOW_SIZE, 4 * bits), min(SIEVE_LIMIT, bits * bits)
+
 
+def candidate_window(base, size=WINDOW_SIZE, limit=SIEVE_LIMIT):
+    """
+    Siebt ein Fenster von size ungeraden Kandidaten base, base + 2, ... mit den SIEVE_PRIMES unter limit. Die Reste
+    von base werden pro kleiner Primzahl nur einmal berechnet, danach werden die Vielfachen in einem bytearray
+    gestrichen. Primzahlen über der Wurzel des größten Kandidaten streichen nichts mehr und werden übersprungen.
+    Nur die übrig gebliebenen Kandidaten müssen noch mit einem teuren Primzahltest geprüft werden.
 
-def generate_prime(bits):
+    :param base: Erster Kandidat, muss ungerade sein.
+    :param size: Anzahl der ungeraden Kandidaten im Fenster.
+    :param limit: Obergrenze (exklusiv) der Siebprimzahlen.
+    :return: Generator für die Kandidaten ohne kleinen Primfaktor (außer sich selbst).
+    >>> list(candidate_window(3, 10))
+    [3, 5, 7, 11, 13, 17, 19]
+    >>> list(candidate_window(1001, 8, limit=7))
+    [1001, 1003, 1007, 1009, 1013]
     """
-    Generiert eine Primzahl mit der gegebenen Bitlänge. Überprüfung durch is_prim.
+    flags = bytearray([1]) * size
+    bound = min(limit - 1, math.isqrt(base + 2 * (size - 1)))
+    for p in SIEVE_PRIMES[:bisect.bisect_right(SIEVE_PRIMES, bound)]:
+        # kleinstes i mit base + 2i = 0 mod p; 2 ist modulo p invertierbar mit (p + 1) / 2
+        i = -base * ((p + 1) // 2) % p
+        if base + 2 * i == p:
+            i += p
+        if i < size:
+            flags[i::p] = bytes(len(range(i, size, p)))
+
+    i = flags.find(1)
+    while i != -1:
+        yield base + 2 * i
+        i = flags.find(1, i + 1)
+
+
+def next_prime(n, engine="auto"):
+    """
+    Sucht die kleinste Primzahl größer als n. Die Kandidaten werden fensterweise mit candidate_window gesiebt.
+
+    :param n: Startwert.
+    :param engine: Name des Primzahltests (siehe is_prim).
+    :return: kleinste Primzahl größer als n.
+    >>> next_prime(24566544301293569)
+    24566544301293587
+    >>> [next_prime(n) for n in (0, 2, 7, 540)]
+    [2, 3, 11, 541]
+    """
+    if n < 2:
+        return 2
+    base = n + 1 | 1
+    size, limit = window_params(base.bit_length())
+    while True:
+        for candidate in candidate_window(base, size, limit):
+            if ENGINES[engine](candidate):
+                return candidate
+        base += 2 * size
+
+
+def generate_prime(bits, engine="auto", stop=None):
+    """
+    Generiert eine Primzahl mit der gegebenen Bitlänge. Ausgehend von einer zufälligen Startzahl werden die Kandidaten
+    mit candidate_window gesiebt und nur die übrigen mit dem Primzahltest geprüft.
 
     :param bits: Länge der Primzahl in Bits.
-    :return: Primzahl mit der gegebenen Bitlänge, die mit 1 beginnt und endet.
+    :param engine: Name des Primzahltests (siehe is_prim).
+    :param stop: optionales Event; ist es gesetzt, wird die Suche vor dem nächsten Primzahltest abgebrochen.
+    :return: Primzahl mit der gegebenen Bitlänge, die mit 1 beginnt und endet (None bei Abbruch).
     >>> n = generate_prime(4)
     >>> len(bin(n)[2:]) == 4
     True
@@ -104,16 +424,95 @@ def generate_prime(bits):
     >>> len(bin(n)[2:]) == 1024
     True
     """
-    while True:
-        n = random.getrandbits(bits) | 1 << (bits - 1) | 1
-        if is_prim(n):
-            return n
+    size, limit = window_params(bits)
+    while stop is None or not stop.is_set():
+        base = random.getrandbits(bits) | 1 << (bits - 1) | 1
+        # nur so viele Kandidaten sieben, wie noch in bits passen
+        fitting = ((1 << bits) - base + 1) // 2
+        for n in candidate_window(base, min(size, fitting), limit):
+            if stop is not None and stop.is_set():
+                return None
+            if ENGINES[engine](n):
+                return n
+    return None
+
+
+def init_prime_worker(stop_events):
+    """
+    Initialisiert einen Worker-Prozess von generate_primes_parallel. Jeder Prozess bekommt einen eigenen
+    Zufallszustand, damit nicht alle Prozesse dieselben Kandidaten prüfen.
+
+    :param stop_events: Liste der Stop-Signale, eines pro gesuchter Primzahl.
+    """
+    global STOP_EVENTS
+    STOP_EVENTS = stop_events
+    random.seed()
+
+
+def search_prime(bits, engine, index):
+    """
+    Sucht in einem Worker-Prozess eine Primzahl, bis sie gefunden oder die Suche über STOP_EVENTS[index] beendet wird.
+
+    :param bits: Länge der Primzahl in Bits.
+    :param engine: Name des Primzahltests (siehe is_prim).
+    :param index: Index der gesuchten Primzahl.
+    :return: (index, Primzahl oder None)
+    """
+    return index, generate_prime(bits, engine, STOP_EVENTS[index])
+
+
+def generate_primes_parallel(sizes, jobs, engine="auto"):
+    """
+    Generiert gleichzeitig je eine Primzahl für jede Bitlänge in sizes. Die jobs Prozesse werden reihum auf die
+    Primzahlen verteilt und suchen mit unabhängigen Zufallszahlen; der erste Treffer gewinnt, die übrigen Prozesse
+    derselben Primzahl hören danach beim nächsten Kandidaten auf. Auf sie wird nicht gewartet.
+
+    :param sizes: Liste von Bitlängen.
+    :param jobs: Anzahl der Prozesse.
+    :param engine: Name des Primzahltests (siehe is_prim).
+    :return: Liste der Primzahlen in der Reihenfolge von sizes.
+    >>> p, q = generate_primes_parallel([64, 32], 2)
+    >>> p.bit_length(), q.bit_length(), is_prim(p), is_prim(q)
+    (64, 32, True, True)
+    """
+    if jobs <= 1:
+        return [generate_prime(bits, engine) for bits in sizes]
+
+    stop_events = [multiprocessing.Event() for _ in sizes]
+    primes = [None] * len(sizes)
+    workers = max(jobs, len(sizes))
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_prime_worker, initargs=(stop_events,))
+    try:
+        pending = {pool.submit(search_prime, sizes[i % len(sizes)], engine, i % len(sizes)) for i in range(workers)}
+        while None in primes:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, prime = future.result()
+                if prime is not None and primes[index] is None:
+                    primes[index] = prime
+                    stop_events[index].set()
+    finally:
+        # die Suche der langsameren Prozesse bestimmt sonst die Laufzeit
+        for event in stop_events:
+            event.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    return primes
+
+
+def generate_prime_parallel(bits, jobs, engine="auto"):
+    """
+    Generiert eine Primzahl mit der gegebenen Bitlänge mit jobs Prozessen (siehe generate_primes_parallel).
+
+    :param bits: Länge der Primzahl in Bits.
+    :param jobs: Anzahl der Prozesse.
+    :param engine: Name des Primzahltests (siehe is_prim).
+    :return: Primzahl mit der gegebenen Bitlänge.
+    """
+    return generate_primes_parallel([bits], jobs, engine)[0]
 
 
 if __name__ == "__main__":
-    number = pow(2, 512) + 1
-    while not is_prim(number):
-        number += 2
+    number = next_prime(pow(2, 512))
     print(f"\nErste Primzahl mit mehr als 512 Bits: {number} \n")
 
     number_to_test = 24566544301293569
@@ -128,10 +527,7 @@ if __name__ == "__main__":
         print(binary[i:i + 12])
 
     print("\nNächst höhere Primzahl von 24566544301293569:")
-    prime_higher = 24566544301293570
-    while not is_prim(prime_higher):
-        prime_higher += 1
-    print(prime_higher)
+    print(next_prime(24566544301293569))
 
     print("\nVersteckte Nachricht in nächst höhere Prim als Binärzahl mot 12 Zeichen/Zeile:")
     binary = bin(24566544301293587)[2:]
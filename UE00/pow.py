@@ -32,6 +32,187 @@ def pow_iterativ(b, e, m):
     return result
 
 
+def pow_kary(b, e, m, k=4):
+    """
+    k-äre Exponentiation: der Exponent wird in Ziffern zur Basis 2^k zerlegt, die Potenzen b^0 .. b^(2^k - 1)
+    werden vorab berechnet. Pro Ziffer gibt es k Quadrierungen und höchstens eine Multiplikation.
+    :param b: Basis
+    :param e: Exponent
+    :param m: Modulo
+    :param k: Bits pro Ziffer
+    :return: b^e mod m
+    >>> pow_kary(63, 17, 91)
+    7
+    >>> all(pow_kary(b, e, 1009, k) == pow(b, e, 1009) for b in range(20) for e in range(70) for k in (1, 3, 5))
+    True
+    """
+    table = [1 % m]
+    for _ in range((1 << k) - 1):
+        table.append(table[-1] * b % m)
+
+    mask = (1 << k) - 1
+    result = 1 % m
+    for shift in range((e.bit_length() - 1) // k * k, -1, -k):
+        for _ in range(k):
+            result = result * result % m
+        digit = (e >> shift) & mask
+        if digit:
+            result = result * table[digit] % m
+    return result
+
+
+def odd_powers(b, m, w):
+    """
+    Ungerade Potenzen b^1, b^3, .. b^(2^w - 1) für die Sliding-Window-Exponentiation.
+    :param b: Basis
+    :param m: Modulo
+    :param w: Fenstergröße
+    :return: Liste mit b^(2i+1) mod m an der Stelle i
+    >>> odd_powers(2, 1000, 3)
+    [2, 8, 32, 128]
+    """
+    table = [b % m]
+    square = b * b % m
+    for _ in range((1 << (w - 1)) - 1):
+        table.append(table[-1] * square % m)
+    return table
+
+
+def window_steps(e, w):
+    """
+    Zerlegt den Exponenten in Sliding-Window-Schritte, beginnend beim höchsten Bit. Jeder Schritt besteht aus der
+    Anzahl der Quadrierungen und der anschließend zu multiplizierenden ungeraden Ziffer (0 für keine).
+    :param e: Exponent
+    :param w: Fenstergröße
+    :return: Liste von (Quadrierungen, Ziffer)
+    >>> window_steps(0b1011000101, 3)
+    [(3, 5), (1, 1), (6, 5)]
+    >>> window_steps(8, 3)
+    [(1, 1), (3, 0)]
+    """
+    steps = []
+    squares = 0
+    i = e.bit_length() - 1
+    while i >= 0:
+        if not (e >> i) & 1:
+            squares += 1
+            i -= 1
+            continue
+        j = max(i - w + 1, 0)
+        while not (e >> j) & 1:
+            j += 1
+        steps.append((squares + i - j + 1, (e >> j) & ((1 << (i - j + 1)) - 1)))
+        squares = 0
+        i = j - 1
+    if squares:
+        steps.append((squares, 0))
+    return steps
+
+
+def pow_steps(b, steps, m, w):
+    """
+    Wertet vorab berechnete Sliding-Window-Schritte (siehe window_steps) für eine Basis aus.
+    :param b: Basis
+    :param steps: Schritte des Exponenten
+    :param m: Modulo
+    :param w: Fenstergröße, mit der die Schritte berechnet wurden
+    :return: b^e mod m
+    """
+    table = odd_powers(b, m, w)
+    result = 1 % m
+    for squares, digit in steps:
+        for _ in range(squares):
+            result = result * result % m
+        if digit:
+            result = result * table[digit >> 1] % m
+    return result
+
+
+def pow_sliding(b, e, m, w=5):
+    """
+    Sliding-Window-Exponentiation mit vorab berechneten ungeraden Potenzen. Nullbits zwischen den Fenstern kosten
+    nur eine Quadrierung, dadurch sind es weniger Multiplikationen als bei pow_kary.
+    :param b: Basis
+    :param e: Exponent
+    :param m: Modulo
+    :param w: maximale Fenstergröße
+    :return: b^e mod m
+    >>> pow_sliding(63, 17, 91)
+    7
+    >>> all(pow_sliding(b, e, 1009, w) == pow(b, e, 1009) for b in range(20) for e in range(70) for w in (1, 2, 4))
+    True
+    """
+    return pow_steps(b, window_steps(e, w), m, w)
+
+
+def pow_batch(bases, e, m, w=5):
+    """
+    Potenziert viele Basen mit demselben Exponenten und Modul (z.B. alle Blöcke unter einem öffentlichen Schlüssel).
+    Die Zerlegung des Exponenten wird nur einmal berechnet.
+    :param bases: Basen
+    :param e: gemeinsamer Exponent
+    :param m: gemeinsamer Modulo
+    :param w: maximale Fenstergröße
+    :return: Liste von b^e mod m in der Reihenfolge von bases
+    >>> pow_batch([42, 7, 0], 17, 3233)
+    [2557, 2369, 0]
+    """
+    steps = window_steps(e, w)
+    return [pow_steps(b, steps, m, w) for b in bases]
+
+
+def fixed_base_table(b, m, bits, w=4):
+    """
+    Tabelle für die Exponentiation mit fester Basis: b^(2^(w*i)) mod m für alle Ziffern eines Exponenten mit
+    höchstens bits Bits. Die Tabelle wird einmal berechnet und für beliebig viele Exponenten verwendet.
+    :param b: Basis
+    :param m: Modulo
+    :param bits: maximale Bitlänge der Exponenten
+    :param w: Bits pro Ziffer
+    :return: (w, m, Potenzen)
+    >>> fixed_base_table(2, 1000, 8)
+    (4, 1000, [2, 536])
+    """
+    powers = [b % m]
+    for _ in range(-(-bits // w) - 1):
+        p = powers[-1]
+        for _ in range(w):
+            p = p * p % m
+        powers.append(p)
+    return w, m, powers
+
+
+def pow_fixed_base(table, e):
+    """
+    Exponentiation mit fester Basis nach Yao: pro Ziffernwert d werden alle Tabelleneinträge mit Ziffer d
+    aufmultipliziert, es gibt keine Quadrierungen mehr.
+    :param table: Tabelle von fixed_base_table
+    :param e: Exponent mit höchstens bits Bits
+    :return: b^e mod m
+    >>> table = fixed_base_table(63, 91, 16)
+    >>> pow_fixed_base(table, 17)
+    7
+    >>> all(pow_fixed_base(table, e) == pow(63, e, 91) for e in range(1 << 16))
+    True
+    """
+    w, m, powers = table
+    mask = (1 << w) - 1
+    digits = []
+    while e:
+        digits.append(e & mask)
+        e >>= w
+    if len(digits) > len(powers):
+        raise ValueError("Exponent ist zu groß für die Tabelle")
+
+    result = product = 1 % m
+    for d in range(mask, 0, -1):
+        for i, digit in enumerate(digits):
+            if digit == d:
+                product = product * powers[i] % m
+        result = result * product % m
+    return result
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -47,6 +228,14 @@ if __name__ == "__main__":
     execution_time = end_time - start_time
     print("Execution time pow_iterativ:", execution_time * 1000, "ms")
 
+    for name, func in [("pow_kary", pow_kary), ("pow_sliding", pow_sliding)]:
+        print(f"\n{name.capitalize()}:")
+        start_time = time.time()
+        print(func(a, b, n))
+        end_time = time.time()
+        execution_time = end_time - start_time
+        print(f"Execution time {name}:", execution_time * 1000, "ms")
+
     print("\nPow:")
     start_time = time.time()
     print(pow(a, b, n))
@@ -0,0 +1,220 @@
+"""
+__author__ = "Paul Waldecker"
+__email__ = "0157@htl.rennweg.at"
+__version__ = "1.0"
+__copyright__ = "Copyright 2024"
+__license__ = "GPL"
+__status__ = "Ready to Review"
+"""
+import argparse
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import miller_rabin
+
+try:
+    import fcntl
+except ImportError:  # Windows: kein flock, der Pool wird dann ohne Sperre verwendet
+    fcntl = None
+
+# Standardverzeichnis des Primzahl-Pools
+POOL_DIR = "prime_pool"
+
+
+def pool_file(directory, bits):
+    """
+    Pfad der Pool-Datei für Primzahlen mit der gegebenen Bitlänge. Die Datei besteht nur aus Datensätzen fester
+    Breite (record_size Bytes, big-endian).
+    :param directory: Verzeichnis des Pools
+    :param bits: Bitlänge der Primzahlen
+    :return: Pfad der Datei
+    >>> pool_file("pool", 1024).as_posix()
+    'pool/primes_1024.bin'
+    """
+    return Path(directory) / f"primes_{bits}.bin"
+
+
+def record_size(bits):
+    """
+    Anzahl der Bytes pro gespeicherter Primzahl.
+    :param bits: Bitlänge der Primzahlen
+    :return: Bytes pro Datensatz
+    >>> record_size(1024), record_size(1025)
+    (128, 129)
+    """
+    return (bits + 7) // 8
+
+
+@contextmanager
+def locked(filename):
+    """
+    Öffnet die Pool-Datei zum Lesen und Schreiben und hält dabei eine exklusive Dateisperre. Die Primzahlen sind
+    geheime Faktoren künftiger Schlüssel, Verzeichnis und Datei sind daher nur für den Besitzer lesbar (0700/0600).
+    :param filename: Pfad der Pool-Datei
+    :return: Kontextmanager mit dem geöffneten File
+    """
+    Path(filename).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    fd = os.open(filename, os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o600)
+    if hasattr(os, "fchmod"):
+        # auch Pool-Dateien, die noch mit der Standard-umask angelegt wurden
+        os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "a+b") as file:
+        if fcntl:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield file
+        finally:
+            if fcntl:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def put(directory, bits, primes):
+    """
+    Hängt Primzahlen an die Pool-Datei an.
+    :param directory: Verzeichnis des Pools
+    :param bits: Bitlänge der Primzahlen
+    :param primes: Liste von Primzahlen mit genau dieser Bitlänge
+    """
+    size = record_size(bits)
+    data = b"".join(p.to_bytes(size, byteorder="big") for p in primes)
+    with locked(pool_file(directory, bits)) as file:
+        file.seek(0, os.SEEK_END)
+        # unvollständige Datensätze (z.B. nach Absturz) abschneiden
+        end = file.tell() - file.tell() % size
+        file.truncate(end)
+        file.write(data)
+
+
+def take(directory, bits):
+    """
+    Entnimmt eine Primzahl aus dem Pool. Die Primzahl wird vor der Rückgabe nochmals mit is_prim geprüft.
+    :param directory: Verzeichnis des Pools
+    :param bits: Bitlänge der Primzahl
+    :return: Primzahl oder None, wenn der Pool leer ist
+    """
+    filename = pool_file(directory, bits)
+    if not filename.is_file():
+        return None
+
+    size = record_size(bits)
+    with locked(filename) as file:
+        end = file.seek(0, os.SEEK_END)
+        end -= end % size
+        while end > 0:
+            end -= size
+            file.seek(end)
+            prime = int.from_bytes(file.read(size), byteorder="big")
+            file.truncate(end)
+            if prime.bit_length() == bits and miller_rabin.is_prim(prime):
+                return prime
+            logging.warning(f"Ungültiger Eintrag in {filename} verworfen")
+    return None
+
+
+def count(directory, bits):
+    """
+    Anzahl der Primzahlen im Pool für eine Bitlänge.
+    :param directory: Verzeichnis des Pools
+    :param bits: Bitlänge der Primzahlen
+    :return: Anzahl der gespeicherten Primzahlen
+    """
+    filename = pool_file(directory, bits)
+    return filename.stat().st_size // record_size(bits) if filename.is_file() else 0
+
+
+def status(directory):
+    """
+    Füllstand des Pools für alle vorhandenen Bitlängen.
+    :param directory: Verzeichnis des Pools
+    :return: Dictionary Bitlänge -> Anzahl der Primzahlen
+    """
+    levels = {}
+    for filename in sorted(Path(directory).glob("primes_*.bin")):
+        bits = int(filename.stem.split("_")[1])
+        levels[bits] = count(directory, bits)
+    return levels
+
+
+def draw_primes(directory, sizes, jobs=1):
+    """
+    Holt je eine Primzahl pro Bitlänge aus dem Pool. Fehlende Primzahlen werden live (mit jobs Prozessen) erzeugt.
+    :param directory: Verzeichnis des Pools
+    :param sizes: Liste von Bitlängen
+    :param jobs: Anzahl der Prozesse für die Live-Erzeugung
+    :return: Liste der Primzahlen in der Reihenfolge von sizes
+    """
+    primes = [take(directory, bits) for bits in sizes]
+    missing = [i for i, p in enumerate(primes) if p is None]
+    if missing:
+        logging.info(f"Prime pool leer für {[sizes[i] for i in missing]} Bits, erzeuge live")
+        generated = miller_rabin.generate_primes_parallel([sizes[i] for i in missing], jobs)
+        for i, p in zip(missing, generated):
+            primes[i] = p
+    return primes
+
+
+def fill(directory, bits, target, jobs=1, batch=8):
+    """
+    Füllt den Pool für eine Bitlänge bis target Primzahlen auf und meldet die Nachfüllrate.
+    :param directory: Verzeichnis des Pools
+    :param bits: Bitlänge der Primzahlen
+    :param target: gewünschter Füllstand
+    :param jobs: Anzahl der Prozesse
+    :param batch: Anzahl der Primzahlen, die auf einmal erzeugt und geschrieben werden
+    :return: Anzahl der neu erzeugten Primzahlen
+    """
+    added = 0
+    start_time = time.perf_counter()
+    while (missing := target - count(directory, bits)) > 0:
+        primes = miller_rabin.generate_primes_parallel([bits] * min(batch, missing), jobs)
+        put(directory, bits, primes)
+        added += len(primes)
+
+    elapsed = time.perf_counter() - start_time
+    if added:
+        logging.info(f"{bits} Bits: {added} Primzahlen in {elapsed:.2f} s ({added / elapsed:.2f} Primzahlen/s)")
+    return added
+
+
+def key_sizes(bits):
+    """
+    Bitlängen von p und q für einen RSA-Schlüssel mit der gegebenen Länge (wie in rsa.generate_keys).
+    :param bits: Länge des Schlüssels in Bits
+    :return: [Bits von p, Bits von q]
+    >>> key_sizes(2048)
+    [1025, 1024]
+    """
+    return [(bits + 1) // 2 + 1, bits // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="prime_pool.py by Paul Waldecker -- pre-generated primes for rsa.py")
+    parser.add_argument("-k", "--keybits", type=int, nargs="+", default=[],
+                        help="fill the pool for RSA keys with these bit lengths (p and q sizes)")
+    parser.add_argument("-b", "--bits", type=int, nargs="+", default=[], help="fill the pool for these prime sizes")
+    parser.add_argument("-t", "--target", type=int, default=16, help="number of primes per size, default=16")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes, default=1")
+    parser.add_argument("-p", "--pool", default=POOL_DIR, help=f"pool directory, default={POOL_DIR}")
+    parser.add_argument("-w", "--watch", type=float,
+                        help="keep running and refill the pool every WATCH seconds")
+    parser.add_argument("-v", "--verbosity", help="increase output verbosity", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbosity else logging.WARNING)
+
+    sizes = sorted(set(args.bits + [b for k in args.keybits for b in key_sizes(k)]))
+    while True:
+        for bits in sizes:
+            fill(args.pool, bits, args.target, args.jobs)
+        for bits, level in status(args.pool).items():
+            print(f"{bits} Bits: {level} Primzahlen")
+        if args.watch is None:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,40 @@ __license__ = "GPL"
 __status__ = "Ready to Review"
 """
 import argparse
+import io
+import itertools
 import logging
+import mmap
 import os
 import pickle
 import random
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 
 import miller_rabin
 import math
+import prime_pool
+
+# Größe der Lese- und Schreibpuffer für die Dateiverschlüsselung
+CHUNK_SIZE = 1 << 20
+WRITE_BUFFER = 1 << 20
+# Blöcke pro Arbeitspaket und maximale Anzahl offener Pakete pro Prozess bei --jobs
+BATCH_BLOCKS = 64
+WINDOW_PER_JOB = 4
+# Blöcke, die beim mmap-Lesen auf einmal in Integer umgewandelt werden
+MMAP_BATCH = 256
+# Binäres Schlüsselformat: Magic, Version, Klartext- und Geheimtextblockgröße, Anzahl der Zahlen;
+# danach jede Zahl mit 4 Byte Längenpräfix, big-endian
+KEY_MAGIC = b"RSAK"
+KEY_VERSION = 1
+KEY_HEADER = struct.Struct(">4sBIIB")
+KEY_LENGTH = struct.Struct(">I")
+# Verschlüsselte Dateien enden mit der Länge des Klartexts, damit der letzte Block genau gekürzt werden kann
+CRYPT_TRAILER = struct.Struct(">Q")
 
 
 def ggt(x: int, y: int) -> int:
@@ -35,18 +61,27 @@ def ggt(x: int, y: int) -> int:
     return x
 
 
-def generate_keys(bits: int):
+def generate_keys(bits: int, jobs: int = 1, pool=None):
     """
     Generiert einen öffentlichen und privaten Schlüssel.
+    Der private Schlüssel enthält zusätzlich p, q, dp, dq und qinv für die Entschlüsselung mit dem chinesischen
+    Restsatz (siehe private_pow).
     :param bits: Länge des Schlüssels in Bits
+    :param jobs: Anzahl der Prozesse für die Primzahlsuche; p und q werden dann gleichzeitig gesucht
+    :param pool: Verzeichnis eines Primzahl-Pools (siehe prime_pool); leere Pools fallen auf die Live-Suche zurück
     :return: public_key, private_key mit Schlüssel, N und Bitlänge vom Schlüssel
     """
-    while True:
-        p = miller_rabin.generate_prime(math.ceil(bits / 2) + 1)
-        q = miller_rabin.generate_prime(bits // 2)
-        n = p * q
-        if n.bit_length() > bits:
-            break
+    sizes = [math.ceil(bits / 2) + 1, bits // 2]
+    draw = partial(prime_pool.draw_primes, pool) if pool else miller_rabin.generate_primes_parallel
+    p, q = draw(sizes, jobs=jobs)
+    # Ist n zu kurz, wird nur q neu gezogen; verworfene q aus dem Pool kommen danach zurück in den Pool
+    rejected = []
+    while (p * q).bit_length() <= bits:
+        rejected.append(q)
+        (q,) = draw(sizes[1:], jobs=jobs)
+    if pool and rejected:
+        prime_pool.put(pool, sizes[1], rejected)
+    n = p * q
 
     phi_n = (p - 1) * (q - 1)
     e = random.getrandbits(bits)
@@ -57,85 +92,390 @@ def generate_keys(bits: int):
 
     d = pow(e, -1, phi_n)
 
+    dp = d % (p - 1)
+    dq = d % (q - 1)
+    qinv = pow(q, -1, p)
+
     public_key = (e, n, e.bit_length())
-    private_key = (d, n, d.bit_length())
+    private_key = (d, n, d.bit_length(), p, q, dp, dq, qinv)
 
     return public_key, private_key
 
 
-def file2ints(filename, bytelength):
+def public_pow(m: int, public_key) -> int:
+    """
+    Berechnet m^e mod n mit dem öffentlichen Schlüssel.
+    :param m: Zahl, die potenziert werden soll
+    :param public_key: öffentlicher Schlüssel
+    :return: m^e mod n
+    >>> public_pow(42, (17, 3233, 5))
+    2557
+    """
+    return pow(m, public_key[0], public_key[1])
+
+
+def private_pow(c: int, private_key) -> int:
+    """
+    Berechnet c^d mod n mit dem privaten Schlüssel (Entschlüsseln bzw. Signieren).
+    Enthält der Schlüssel die CRT-Parameter (p, q, dp, dq, qinv), werden statt einer Exponentiation modulo n zwei
+    halb so große modulo p und q gerechnet und nach Garner wieder zusammengesetzt. Alte Schlüssel (d, n, bitlen)
+    werden weiterhin mit pow(c, d, n) verarbeitet.
+    :param c: Zahl, die potenziert werden soll
+    :param private_key: privater Schlüssel
+    :return: c^d mod n
+    >>> private_pow(pow(42, 17, 3233), (2753, 3233, 12, 61, 53, 53, 49, 38))
+    42
+    >>> private_pow(pow(42, 17, 3233), (2753, 3233, 12))
+    42
+    """
+    if len(private_key) < 8:
+        return pow(c, private_key[0], private_key[1])
+
+    p, q, dp, dq, qinv = private_key[3:8]
+    m1 = pow(c, dp, p)
+    m2 = pow(c, dq, q)
+    h = qinv * (m1 - m2) % p
+    return m2 + h * q
+
+
+def block_sizes(n: int):
+    """
+    Berechnet die Blockgrößen für Klartext und Geheimtext. Geheimtextblöcke sind um ein Byte länger, damit jeder
+    Wert kleiner n Platz hat, und werden immer in voller Breite geschrieben.
+    :param n: Modul des Schlüssels
+    :return: (Bytes pro Klartextblock, Bytes pro Geheimtextblock)
+    >>> block_sizes(3233)
+    (1, 2)
+    >>> block_sizes(2 ** 1024 + 1)
+    (128, 129)
+    """
+    clear_bytes = n.bit_length() // 8
+    return clear_bytes, clear_bytes + 1
+
+
+def file2ints(filename, bytelength, count=None):
     """
-    Liesst eine Datei und gibt die Bytes als Integer zurück.
+    Liesst eine Datei und gibt die Bytes als Integer zurück. Die Datei wird in großen Stücken (CHUNK_SIZE, auf ganze
+    Blöcke gerundet) gelesen und erst im Speicher in Blöcke zerlegt.
     :param filename: Name der Datei.
     :param bytelength: Anzahl der Bytes, die gelesen werden sollen.
+    :param count: Anzahl der Blöcke, None bis zum Dateiende.
     :return: Generator für die Bytes der Datei.
     """
+    chunk_size = max(1, CHUNK_SIZE // bytelength) * bytelength
+    remaining = None if count is None else count * bytelength
     with open(filename, "rb") as file:
-        while (byte := file.read(bytelength)):
-            yield int.from_bytes(byte, byteorder="big")
+        while (chunk := file.read(chunk_size if remaining is None else min(chunk_size, remaining))):
+            if remaining is not None:
+                remaining -= len(chunk)
+            for start in range(0, len(chunk), bytelength):
+                yield int.from_bytes(chunk[start:start + bytelength], byteorder="big")
 
 
-def ints2file(filename, ints, bytelength):
+def mmap2ints(filename, bytelength, first=0, count=None):
     """
-    Writes a list of integers to a file.
-    :param filename: The name of the file.
-    :param ints: The list of integers.
-    :param bytelength: The byte length used for each integer.
+    Liest Blöcke über eine speichereingeblendete Datei (mmap). Die Blöcke werden als memoryview direkt aus der
+    Abbildung geschnitten und in Paketen von MMAP_BATCH Blöcken in Integer umgewandelt; pro Block gibt es keinen
+    read-Aufruf. Über first und count kann ein beliebiger Blockbereich gelesen werden, ohne die Datei von Anfang an
+    zu lesen.
+    :param filename: Name der Datei.
+    :param bytelength: Anzahl der Bytes pro Block.
+    :param first: Index des ersten Blocks.
+    :param count: Anzahl der Blöcke, None bis zum Dateiende.
+    :return: Generator für die Blöcke als Integer.
     """
-    with open(filename, "ab") as file:
-        for i in ints:
-            # Convert integer to bytes and remove leading null bytes before writing
-            byte_data = i.to_bytes(bytelength, byteorder="big").lstrip(b'\x00')
-            file.write(byte_data)
+    with open(filename, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        start = first * bytelength
+        end = size if count is None else min(size, start + count * bytelength)
+        if start >= end:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                batch_bytes = MMAP_BATCH * bytelength
+                for batch_start in range(start, end, batch_bytes):
+                    batch_end = min(batch_start + batch_bytes, end)
+                    batch = [int.from_bytes(view[i:min(i + bytelength, batch_end)], byteorder="big")
+                             for i in range(batch_start, batch_end, bytelength)]
+                    yield from batch
+            finally:
+                view.release()
+
+
+def apply_batch(func, ints):
+    """
+    Wendet func auf ein Arbeitspaket von Blöcken an. Läuft in den Worker-Prozessen von crypt_blocks.
+    :param func: Funktion, die auf jeden Block angewendet wird
+    :param ints: Liste von Blöcken
+    :return: Liste der Ergebnisse
+    >>> apply_batch(abs, [-1, 2, -3])
+    [1, 2, 3]
+    """
+    return [func(i) for i in ints]
 
 
-def encryptFile(clearfile, cryptfile, public_key):
+def crypt_blocks(ints, func, jobs=1):
+    """
+    Wendet func auf alle Blöcke an und liefert die Ergebnisse in der ursprünglichen Reihenfolge. Mit jobs > 1 werden
+    Pakete von BATCH_BLOCKS Blöcken in einem Prozesspool gerechnet; es sind höchstens jobs * WINDOW_PER_JOB Pakete
+    gleichzeitig unterwegs, damit der Speicherverbrauch begrenzt bleibt.
+    func muss dafür picklebar sein (Funktion auf Modulebene oder functools.partial).
+    :param ints: Iterator über die Blöcke
+    :param func: Funktion, die auf jeden Block angewendet wird
+    :param jobs: Anzahl der Prozesse
+    :return: Generator für die Ergebnisse
+    >>> list(crypt_blocks(iter(range(5)), partial(public_pow, public_key=(17, 3233, 5))))
+    [0, 1, 1752, 1211, 1387]
     """
-    Encrypts a message using the public key.
-    :param m: The message to encrypt.
+    if jobs <= 1:
+        yield from map(func, ints)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        while (batch := list(itertools.islice(ints, BATCH_BLOCKS))):
+            pending.append(pool.submit(apply_batch, func, batch))
+            if len(pending) >= jobs * WINDOW_PER_JOB:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def crypt_file(infile, outfile, func, in_bytelength, out_bytelength, count=None, last_length=None, jobs=1,
+               use_mmap=False):
+    """
+    Streamt eine Datei blockweise durch func. Ein- und Ausgabedatei werden nur einmal geöffnet, geschrieben wird
+    über einen gepufferten Writer mit Blöcken fester Breite.
+    :param infile: Eingabedatei
+    :param outfile: Ausgabedatei (wird überschrieben)
+    :param func: Funktion, die auf jeden Block (als Integer) angewendet wird
+    :param in_bytelength: Bytes pro Eingabeblock
+    :param out_bytelength: Bytes pro Ausgabeblock
+    :param count: Anzahl der Eingabeblöcke, None bis zum Dateiende
+    :param last_length: vom letzten Ausgabeblock nur die letzten last_length Bytes schreiben (kürzerer letzter
+    Klartextblock), None für den ganzen Block
+    :param jobs: Anzahl der Prozesse (siehe crypt_blocks)
+    :param use_mmap: Eingabe mit mmap2ints statt file2ints lesen
+    :return: Anzahl der verarbeiteten Bytes
+    """
+    start_time = time.perf_counter()
+    reader = mmap2ints if use_mmap else file2ints
+    with open(outfile, "wb", buffering=WRITE_BUFFER) as file:
+        previous = None
+        for i in crypt_blocks(reader(infile, in_bytelength, count=count), func, jobs):
+            if previous is not None:
+                file.write(previous.to_bytes(out_bytelength, byteorder="big"))
+            previous = i
+        if previous is not None:
+            byte_data = previous.to_bytes(out_bytelength, byteorder="big")
+            file.write(byte_data if last_length is None else byte_data[out_bytelength - last_length:])
+
+    size = os.path.getsize(infile)
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"{size} Bytes in {elapsed:.3f} s verarbeitet ({size / max(elapsed, 1e-9):.0f} Bytes/s)")
+    return size
+
+
+def encryptFile(clearfile, cryptfile, public_key, jobs=1, use_mmap=False):
+    """
+    Encrypts a file using the public key. Every block is written with the full crypt block width, followed by the
+    length of the clear text (CRYPT_TRAILER).
+    :param clearfile: The file to encrypt.
+    :param cryptfile: The file for the encrypted message.
     :param public_key: The public key.
-    :return: The encrypted message.
+    :param jobs: Number of worker processes.
+    :param use_mmap: Read clearfile through mmap.
+    :return: Number of bytes read from clearfile.
     """
-    with open(cryptfile, "w") as file:
-        file.write("")
-    for i in file2ints(clearfile, public_key[1].bit_length() // 8):
-        ints2file(cryptfile, [pow(i, public_key[0], public_key[1])], public_key[1].bit_length() // 8 + 1)
+    clear_bytes, crypt_bytes = block_sizes(public_key[1])
+    size = crypt_file(clearfile, cryptfile, partial(public_pow, public_key=public_key), clear_bytes, crypt_bytes,
+                      jobs=jobs, use_mmap=use_mmap)
+    with open(cryptfile, "ab") as file:
+        file.write(CRYPT_TRAILER.pack(size))
+    return size
 
 
-def decryptFile(cryptfile, clearfile, private_key):
+def crypt_layout(cryptfile, clear_bytes, crypt_bytes):
     """
-    Encrypts a message using the public key.
-    :param m: The message to encrypt.
-    :param public_key: The public key.
-    :return: The encrypted message.
+    Liest die Länge des Klartexts am Ende einer verschlüsselten Datei und prüft sie gegen die Anzahl der Blöcke.
+    :param cryptfile: verschlüsselte Datei
+    :param clear_bytes: Bytes pro Klartextblock
+    :param crypt_bytes: Bytes pro Geheimtextblock
+    :return: (Anzahl der Blöcke, Länge des Klartexts)
+    """
+    size = os.path.getsize(cryptfile)
+    blocks, rest = divmod(size - CRYPT_TRAILER.size, crypt_bytes)
+    if size < CRYPT_TRAILER.size or rest:
+        raise ValueError(f"{cryptfile} ist keine mit diesem Schlüssel verschlüsselte Datei")
+    with open(cryptfile, "rb") as file:
+        file.seek(-CRYPT_TRAILER.size, os.SEEK_END)
+        (clear_size,) = CRYPT_TRAILER.unpack(file.read(CRYPT_TRAILER.size))
+    if -(-clear_size // clear_bytes) != blocks:
+        raise ValueError(f"{cryptfile} ist beschädigt: {clear_size} Bytes passen nicht zu {blocks} Blöcken")
+    return blocks, clear_size
+
+
+def decryptFile(cryptfile, clearfile, private_key, jobs=1, use_mmap=False):
+    """
+    Decrypts a file using the private key. Keys with CRT parameters are decrypted via private_pow.
+    :param cryptfile: The encrypted file.
+    :param clearfile: The file for the decrypted message.
+    :param private_key: The private key.
+    :param jobs: Number of worker processes.
+    :param use_mmap: Read cryptfile through mmap.
+    :return: Number of bytes read from cryptfile.
     """
-    with open(clearfile, "w") as file:
-        file.write("")
-    for i in file2ints(cryptfile, private_key[1].bit_length() // 8 + 1):
-        ints2file(clearfile, [pow(i, private_key[0], private_key[1])], private_key[1].bit_length() // 8)
+    clear_bytes, crypt_bytes = block_sizes(private_key[1])
+    blocks, clear_size = crypt_layout(cryptfile, clear_bytes, crypt_bytes)
+    return crypt_file(cryptfile, clearfile, partial(private_pow, private_key=private_key), crypt_bytes, clear_bytes,
+                      count=blocks, last_length=clear_size - (blocks - 1) * clear_bytes, jobs=jobs, use_mmap=use_mmap)
+
+
+def decrypt_blocks(cryptfile, private_key, first, count):
+    """
+    Decrypts only the blocks first .. first + count - 1 of an encrypted file. The blocks are addressed directly
+    in the memory-mapped file, nothing before them is read.
+    :param cryptfile: The encrypted file.
+    :param private_key: The private key.
+    :param first: Index of the first block.
+    :param count: Number of blocks.
+    :return: The decrypted bytes of the block range.
+    """
+    clear_bytes, crypt_bytes = block_sizes(private_key[1])
+    total, clear_size = crypt_layout(cryptfile, clear_bytes, crypt_bytes)
+    count = max(0, min(count, total - first))
+    blocks = [private_pow(i, private_key).to_bytes(clear_bytes, byteorder="big")
+              for i in mmap2ints(cryptfile, crypt_bytes, first, count)]
+    if blocks and first + len(blocks) == total:
+        # Der letzte Klartextblock ist kürzer, wenn die Länge des Klartexts kein Vielfaches von clear_bytes ist
+        blocks[-1] = blocks[-1][clear_bytes - (clear_size - (total - 1) * clear_bytes):]
+    return b"".join(blocks)
+
+
+def key2bytes(key):
+    """
+    Kodiert einen Schlüssel im binären Schlüsselformat (siehe KEY_HEADER). Die Blockgrößen werden mitgespeichert.
+    :param key: öffentlicher (3 Zahlen) oder privater Schlüssel (3 oder 8 Zahlen)
+    :return: kodierter Schlüssel
+    >>> key2bytes((17, 3233, 5))[:4], len(key2bytes((17, 3233, 5)))
+    (b'RSAK', 30)
+    """
+    clear_bytes, crypt_bytes = block_sizes(key[1])
+    parts = [KEY_HEADER.pack(KEY_MAGIC, KEY_VERSION, clear_bytes, crypt_bytes, len(key))]
+    for i in key:
+        data = i.to_bytes((i.bit_length() + 7) // 8, byteorder="big")
+        parts.append(KEY_LENGTH.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def bytes2key(data):
+    """
+    Dekodiert einen Schlüssel aus dem binären Schlüsselformat.
+    :param data: kodierter Schlüssel
+    :return: Schlüssel als Tupel
+    >>> bytes2key(key2bytes((2753, 3233, 12, 61, 53, 53, 49, 38)))
+    (2753, 3233, 12, 61, 53, 53, 49, 38)
+    >>> bytes2key(key2bytes((17, 3233, 5))[:20])
+    Traceback (most recent call last):
+    ...
+    ValueError: Schlüsseldatei ist abgeschnitten
+    """
+    if len(data) < KEY_HEADER.size:
+        raise ValueError("Schlüsseldatei ist abgeschnitten")
+    magic, version, clear_bytes, crypt_bytes, count = KEY_HEADER.unpack_from(data)
+    if magic != KEY_MAGIC:
+        raise ValueError("Keine Schlüsseldatei im Binärformat")
+    if version != KEY_VERSION:
+        raise ValueError(f"Nicht unterstützte Version {version} des Schlüsselformats")
+
+    key = []
+    offset = KEY_HEADER.size
+    for _ in range(count):
+        if offset + KEY_LENGTH.size > len(data):
+            raise ValueError("Schlüsseldatei ist abgeschnitten")
+        (length,) = KEY_LENGTH.unpack_from(data, offset)
+        offset += KEY_LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("Schlüsseldatei ist abgeschnitten")
+        key.append(int.from_bytes(data[offset:offset + length], byteorder="big"))
+        offset += length
+    if len(key) < 3 or block_sizes(key[1]) != (clear_bytes, crypt_bytes):
+        raise ValueError("Schlüsseldatei ist beschädigt")
+    return tuple(key)
 
 
 def save_key(key, filename):
-    """Speichert den Schlüssel (öffentlich oder privat) in einer Datei mit pickle."""
+    """Speichert den Schlüssel (öffentlich oder privat) im binären Schlüsselformat."""
     with open(filename, 'wb') as f:
-        pickle.dump(key, f)
+        f.write(key2bytes(key))
 
 
-def load_key(filename):
-    """Laedt den Schlüssel (öffentlich oder privat) aus einer Datei mit pickle."""
+@lru_cache(maxsize=16)
+def _load_key(filename, mtime_ns, size):
+    """Liest und dekodiert eine Schlüsseldatei; mtime_ns und size machen den Cache-Eintrag bei Änderungen ungültig."""
     with open(filename, 'rb') as f:
-        return pickle.load(f)
+        data = f.read()
+    if not data.startswith(KEY_MAGIC):
+        # pickle.loads würde beliebigen Code ausführen; alte Dateien müssen bewusst mit --convert umgewandelt werden
+        raise ValueError(f"{filename} ist keine Schlüsseldatei im Binärformat (alte pickle-Dateien mit --convert "
+                         f"umwandeln)")
+    return bytes2key(data)
+
+
+class LegacyKeyUnpickler(pickle.Unpickler):
+    """Unpickler für alte Schlüsseldateien, der keine Klassen oder Funktionen lädt (nur Tupel, Listen und int)."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"{module}.{name} ist in einer Schlüsseldatei nicht erlaubt")
+
+
+def convert_key(filename):
+    """
+    Wandelt eine alte, mit pickle gespeicherte Schlüsseldatei in das binäre Schlüsselformat um. Nur für Dateien aus
+    vertrauenswürdiger Quelle gedacht; geladen werden ausschließlich Tupel/Listen von Zahlen.
+    :param filename: alte Schlüsseldatei, wird überschrieben
+    :return: Schlüssel als Tupel
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if data.startswith(KEY_MAGIC):
+        return bytes2key(data)
+    try:
+        key = LegacyKeyUnpickler(io.BytesIO(data)).load()
+    except Exception as e:
+        raise ValueError(f"{filename} ist keine alte Schlüsseldatei: {e}")
+    if not isinstance(key, (tuple, list)) or len(key) < 3 or not all(type(i) is int for i in key):
+        raise ValueError(f"{filename} enthält keinen Schlüssel")
+    key = tuple(key)
+    save_key(key, filename)
+    return key
+
+
+def load_key(filename):
+    """
+    Laedt den Schlüssel (öffentlich oder privat) aus einer Datei. Bereits gelesene Schlüssel werden im Prozess
+    zwischengespeichert, solange sich die Datei nicht ändert.
+    """
+    stat = os.stat(filename)
+    return _load_key(os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
 
 
 def main():
     parser = argparse.ArgumentParser(description="RSA Encryption/Decryption Tool")
 
     parser.add_argument("-v", "--verbosity", help="increase output verbosity", action="store_true")
+    parser.add_argument("-j", "--jobs", help="number of worker processes for keygen/encryption/decryption, default=1",
+                        type=int, default=1)
+    parser.add_argument("-p", "--pool", help="draw key primes from this prime pool directory (see prime_pool.py)")
+    parser.add_argument("-m", "--mmap", help="read the input file through mmap", action="store_true")
 
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("-k", "--keygen", help="generate new RSA keys with the given bit length", type=int)
     group.add_argument("-e", "--encrypt", help="encrypt a file")
     group.add_argument("-d", "--decrypt", help="decrypt a file")
+    group.add_argument("--convert", nargs="+", help="convert trusted key files from the old pickle format")
 
     args = parser.parse_args()
 
@@ -146,13 +486,19 @@ def main():
     # Key generation
     if args.keygen:
         logging.info(f"Generating RSA keys of length {args.keygen} bits...")
-        private_key, public_key = generate_keys(args.keygen)
+        public_key, private_key = generate_keys(args.keygen, args.jobs, args.pool)
 
         # Save the keys
         save_key(private_key, 'private_key.pem')
         save_key(public_key, 'public_key.pem')
         logging.info(f"Keys saved to 'private_key.pem' and 'public_key.pem'.")
 
+    # Conversion of old key files
+    elif args.convert:
+        for filename in args.convert:
+            convert_key(filename)
+            logging.info(f"{filename} converted to the binary key format")
+
     # File encryption
     elif args.encrypt:
         logging.info(f"Encrypting file: {args.encrypt}")
@@ -162,7 +508,7 @@ def main():
 
         public_key = load_key('public_key.pem')
         output_file = args.encrypt + ".enc"
-        encryptFile(args.encrypt, output_file, public_key)
+        encryptFile(args.encrypt, output_file, public_key, args.jobs, args.mmap)
         logging.info(f"File encrypted to: {output_file}")
 
     # File decryption
@@ -174,7 +520,7 @@ def main():
 
         private_key = load_key('private_key.pem')
         output_file = args.decrypt.replace(".enc", ".dec")  # Removing the .enc extension
-        decryptFile(args.decrypt, output_file, private_key)
+        decryptFile(args.decrypt, output_file, private_key, args.jobs, args.mmap)
         logging.info(f"File decrypted to: {output_file}")
 
 
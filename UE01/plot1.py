@@ -6,67 +6,173 @@ __copyright__ = "Copyright 2024"
 __license__ = "GPL"
 __status__ = "Ready to Review"
 """
-import matplotlib.pyplot as plt
+import argparse
 import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
 
 PI = math.pi
 CNT = 1024
-# CNT Werte von -pi bis pi
-X = [2 * PI * i / CNT - PI for i in range(CNT)]
-C = [math.cos(x) for x in X]
-S = [math.sin(x) for x in X]
-
-plt.figure(figsize=(10, 6), dpi=80)
-# Ändere die Linienfarbe und den Linienstil
-plt.plot(X, C, color="green", linewidth=2.5, linestyle="--", label="Cosinus")
-plt.plot(X, S, color="orange", linewidth=2.5, linestyle="-.", label="Sinus")
-
-plt.legend(loc='upper left', frameon=False)
-
-plt.xticks([-PI, -PI / 2, 0, PI / 2, PI], [r'$-\pi$', r'$-\pi/2$', r'$0$', r'$+\pi/2$', r'$+\pi$'])
-plt.yticks([-1, 0, 1], [r'$-1$', r'$0$', r'$+1$'])
-
-ax = plt.gca()
-ax.spines['right'].set_color('none')
-ax.spines['top'].set_color('none')
-ax.xaxis.set_ticks_position('bottom')
-ax.spines['bottom'].set_bounds(min(X), max(X))
-ax.spines['bottom'].set_position(('data', 0))
-ax.yaxis.set_ticks_position('left')
-ax.spines['left'].set_position(('data', 0))
-ax.spines['left'].set_bounds(-1, 1)
-
-ax.annotate('', xy=(1.20*max(X), 0), xytext=(1.20*min(X), 0),
-                arrowprops=dict(arrowstyle='-|>,head_width=0.4,head_length=0.8', color='black', lw=4))
-ax.annotate('', xy=(0, 1.2), xytext=(0, -1.2),
-                arrowprops=dict(arrowstyle='-|>,head_width=0.4,head_length=0.8', color='black', lw=4))
-
-t = 2 * PI / 3
-plt.plot([t, t], [0, math.sin(t)], color='orange', linewidth=2.5, linestyle="--")
-plt.scatter([t], [math.sin(t)], 50, color='orange')
-plt.annotate(r'$\sin\left(\frac{2\pi}{3}\right)=\frac{\sqrt{3}}{2}$',
-             xy=(t, math.sin(t)), xycoords='data', xytext=(+10, +30), textcoords='offset points',
-             fontsize=16, arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=.2"))
-
-plt.plot([t, t], [0, math.cos(t)], color='green', linewidth=2.5, linestyle="--")
-plt.scatter([t], [math.cos(t)], 50, color='green')
-plt.annotate(r'$\cos\left(\frac{2\pi}{3}\right) = -\frac{1}{2}$',
-             xy=(t, math.cos(t)), xycoords='data', xytext=(-90, -50), textcoords='offset points',
-             fontsize=16, arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=.2"))
-
-plt.title('Plot von Paul Waldecker', fontsize=20)
-
-#plt.annotate('', xy=(PI, 0), xytext=(-PI, 0), arrowprops=dict(arrowstyle='->', color='black'))
-#plt.annotate('', xy=(0, 1), xytext=(0, -1), arrowprops=dict(arrowstyle='->', color='black'))
-
-plt.xlim(min(X) * 1.2, max(X) * 1.2)
-plt.ylim(-1.2, 1.2)
-
-for label in ax.get_xticklabels() + ax.get_yticklabels():
-    label.set_fontsize(16)
-    label.set_bbox(dict(facecolor='white', edgecolor='None', alpha=0.65))
-
-ax.set_axisbelow(True)
-
-plt.savefig("plot1_waldecker.png", dpi=72)
-plt.show()
\ No newline at end of file
+# Markierte Stelle auf der x-Achse
+T = 2 * PI / 3
+# Kurven: (Name, Funktion, Farbe, Linienstil, Beschriftung an der Stelle T, Versatz der Beschriftung)
+CURVES = [
+    ("Cosinus", np.cos, "green", "--", r'$\cos\left(\frac{2\pi}{3}\right) = -\frac{1}{2}$', (-90, -50)),
+    ("Sinus", np.sin, "orange", "-.", r'$\sin\left(\frac{2\pi}{3}\right)=\frac{\sqrt{3}}{2}$', (+10, +30)),
+]
+ARROW = dict(arrowstyle='-|>,head_width=0.4,head_length=0.8', color='black', lw=4)
+
+
+def samples(func, count=CNT):
+    """
+    Berechnet count Werte von func von -pi bis pi (ohne pi) mit NumPy.
+    :param func: Funktion, die auf ein NumPy-Array angewendet wird
+    :param count: Anzahl der Werte
+    :return: (X, func(X)) als NumPy-Arrays
+    >>> x, y = samples(np.sin, 4)
+    >>> [round(float(v), 4) for v in x], [round(float(v), 4) for v in y]
+    ([-3.1416, -1.5708, 0.0, 1.5708], [-0.0, -1.0, 0.0, 1.0])
+    """
+    x = np.linspace(-PI, PI, count, endpoint=False)
+    return x, func(x)
+
+
+def draw(fig, count=CNT, curves=CURVES, t=T, title='Plot von Paul Waldecker'):
+    """
+    Zeichnet die Kurven mit Achsen durch den Ursprung, Pfeilen und Beschriftung der Stelle t in eine Figure.
+    :param fig: matplotlib Figure
+    :param count: Anzahl der Werte pro Kurve
+    :param curves: Liste von Kurven wie in CURVES
+    :param t: markierte Stelle auf der x-Achse, None für keine Markierung
+    :param title: Titel des Plots
+    :return: Axes des Plots
+    """
+    ax = fig.add_subplot()
+    limit = 0
+    for label, func, color, linestyle, annotation, offset in curves:
+        x, y = samples(func, count)
+        limit = max(limit, float(np.abs(y).max()))
+        ax.plot(x, y, color=color, linewidth=2.5, linestyle=linestyle, label=label)
+    limit = limit or 1
+    xmin, xmax = float(x[0]), float(x[-1])
+
+    ax.legend(loc='upper left', frameon=False)
+
+    ax.set_xticks([-PI, -PI / 2, 0, PI / 2, PI], [r'$-\pi$', r'$-\pi/2$', r'$0$', r'$+\pi/2$', r'$+\pi$'])
+    ax.set_yticks([-limit, 0, limit], [f'$-{limit:g}$', r'$0$', f'$+{limit:g}$'])
+
+    ax.spines['right'].set_color('none')
+    ax.spines['top'].set_color('none')
+    ax.xaxis.set_ticks_position('bottom')
+    ax.spines['bottom'].set_bounds(xmin, xmax)
+    ax.spines['bottom'].set_position(('data', 0))
+    ax.yaxis.set_ticks_position('left')
+    ax.spines['left'].set_position(('data', 0))
+    ax.spines['left'].set_bounds(-limit, limit)
+
+    ax.annotate('', xy=(1.20 * xmax, 0), xytext=(1.20 * xmin, 0), arrowprops=ARROW)
+    ax.annotate('', xy=(0, 1.2 * limit), xytext=(0, -1.2 * limit), arrowprops=ARROW)
+
+    if t is not None:
+        for label, func, color, linestyle, annotation, offset in curves:
+            value = float(func(np.float64(t)))
+            ax.plot([t, t], [0, value], color=color, linewidth=2.5, linestyle="--")
+            ax.scatter([t], [value], 50, color=color)
+            if annotation:
+                ax.annotate(annotation, xy=(t, value), xycoords='data', xytext=offset, textcoords='offset points',
+                            fontsize=16, arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=.2"))
+
+    ax.set_title(title, fontsize=20)
+
+    ax.set_xlim(xmin * 1.2, xmax * 1.2)
+    ax.set_ylim(-1.2 * limit, 1.2 * limit)
+
+    for label in ax.get_xticklabels() + ax.get_yticklabels():
+        label.set_fontsize(16)
+        label.set_bbox(dict(facecolor='white', edgecolor='None', alpha=0.65))
+
+    ax.set_axisbelow(True)
+    return ax
+
+
+def render(filename, count=CNT, curves=CURVES, t=T, title='Plot von Paul Waldecker', size=(10, 6), dpi=72):
+    """
+    Rendert den Plot ohne Fenster in eine Datei. Es wird eine eigene Figure ohne pyplot verwendet (Agg), daher
+    können mehrere Plots gleichzeitig in einem Prozess oder in mehreren Prozessen gerendert werden.
+    :param filename: Ausgabedatei, das Format ergibt sich aus der Endung
+    :param count: Anzahl der Werte pro Kurve
+    :param curves: Liste von Kurven wie in CURVES
+    :param t: markierte Stelle auf der x-Achse, None für keine Markierung
+    :param title: Titel des Plots
+    :param size: Größe in Zoll
+    :param dpi: Auflösung der Ausgabedatei
+    :return: filename
+    """
+    fig = Figure(figsize=size, dpi=80)
+    draw(fig, count, curves, t, title)
+    fig.savefig(filename, dpi=dpi)
+    return filename
+
+
+def render_variant(variant):
+    """
+    Rendert eine Variante (Dictionary mit den Parametern von render). Läuft in den Worker-Prozessen von
+    render_variants.
+    :param variant: Parameter für render
+    :return: Name der geschriebenen Datei
+    """
+    return render(**variant)
+
+
+def render_variants(variants, jobs=1):
+    """
+    Rendert mehrere Varianten (z.B. Auflösungen oder Anzahl der Werte), mit jobs > 1 in einem Prozesspool. Jeder
+    Prozess importiert matplotlib nur einmal und rendert dann beliebig viele Varianten.
+    :param variants: Liste von Dictionaries mit den Parametern von render
+    :param jobs: Anzahl der Prozesse
+    :return: Liste der geschriebenen Dateien
+    """
+    if jobs <= 1:
+        return [render_variant(variant) for variant in variants]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(render_variant, variants))
+
+
+def show(count=CNT, curves=CURVES, t=T):
+    """
+    Zeigt den Plot in einem Fenster an.
+    :param count: Anzahl der Werte pro Kurve
+    :param curves: Liste von Kurven wie in CURVES
+    :param t: markierte Stelle auf der x-Achse
+    """
+    import matplotlib.pyplot as plt
+
+    draw(plt.figure(figsize=(10, 6), dpi=80), count, curves, t)
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="plot1.py by Paul Waldecker -- draws sine and cosine")
+    parser.add_argument("-o", "--output", default="plot1_waldecker.png",
+                        help="output file; {dpi} and {count} are replaced per variant, default=plot1_waldecker.png")
+    parser.add_argument("-n", "--count", type=int, nargs="+", default=[CNT], help=f"samples per curve, default={CNT}")
+    parser.add_argument("-r", "--dpi", type=int, nargs="+", default=[72], help="resolutions, default=72")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes, default=1")
+    parser.add_argument("-s", "--show", action="store_true", help="also show the plot in a window")
+    args = parser.parse_args()
+
+    variants = [{"filename": args.output.format(dpi=dpi, count=count), "count": count, "dpi": dpi}
+                for count in args.count for dpi in args.dpi]
+    if len({variant["filename"] for variant in variants}) < len(variants):
+        parser.error("several variants need {dpi} and/or {count} in --output")
+    for filename in render_variants(variants, args.jobs):
+        print(f"Plot gespeichert als: {filename}")
+
+    if args.show:
+        show(args.count[0])
+
+
+if __name__ == "__main__":
+    main()
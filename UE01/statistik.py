@@ -7,22 +7,50 @@ __license__ = "GPL"
 __status__ = "Ready to Review"
 """
 import argparse
+import hashlib
+import json
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from dateutil import parser
+from pathlib import Path
 import subprocess
 import sys
 
+import numpy as np
 from matplotlib import pyplot as plt
 
 
-def run_git_log(author, path, verbose):
+# Nach so vielen Commits wird im Streaming-Modus der Fortschritt ausgegeben (mit --verbose)
+PROGRESS_EVERY = 100000
+# Form des Histogramms: Wochentag x Stunde
+SHAPE = (7, 24)
+# Raster für create_grid: höchstens GRID_COLUMNS x GRID_ROWS Teilplots pro Bild (6 Zoll pro Zeile bei 100 dpi), damit
+# auch bei hunderten authors das Limit von Agg (2^16 Pixel pro Seite) nicht erreicht wird
+GRID_COLUMNS = 3
+GRID_ROWS = 10
+
+
+class GitLogError(Exception):
     """
-    Diese Funktion führt ein git log command aus und gibt die Ausgabe zurück
+    git log konnte nicht gestartet werden oder ist mit einem Fehler beendet worden (z.B. kein Repository)
+    """
+
+
+def git_log_command(author, path, revisions=None):
+    """
+    Diese Funktion baut das git log command zusammen
     :param author: Der author des git repositories
     :param path: Der absolute Pfad zum git repository
-    :param verbose: ob verbose oder nicht
-    :return: Gib die Ausgabe des git log commands zurück
+    :param revisions: Commit-Bereich für git log (z.B. "alt..neu"), sonst HEAD
+    :return: git log command als Liste
+    >>> git_log_command('paul', '/tmp/repo')
+    ['git', '-C', '/tmp/repo', 'log', '--author=paul', '--pretty=%an;%at %ad---END---', '--date=format:%z']
+    >>> git_log_command('', '', 'abc..def')
+    ['git', 'log', '--pretty=%an;%at %ad---END---', '--date=format:%z', 'abc..def']
     """
-    git_command = ['git', 'log', '--pretty=%an;%ad---END---', '--date=rfc']
+    git_command = ['git', 'log', '--pretty=%an;%at %ad---END---', '--date=format:%z']
 
     if author:
         git_command.insert(2, '--author={}'.format(author))
@@ -31,6 +59,34 @@ def run_git_log(author, path, verbose):
         git_command.insert(1, '-C')
         git_command.insert(2, path)
 
+    if revisions:
+        git_command.append(revisions)
+
+    return git_command
+
+
+def run_git(path, *args):
+    """
+    Diese Funktion führt ein kurzes git command aus (z.B. rev-parse)
+    :param path: Der Pfad zum git repository
+    :param args: Argumente für git
+    :return: Ausgabe ohne Whitespace am Ende oder None, wenn git einen Fehler meldet
+    """
+    git_command = ['git'] + (['-C', path] if path else []) + list(args)
+    result = subprocess.run(git_command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, encoding='utf-8')
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def run_git_log(author, path, verbose):
+    """
+    Diese Funktion führt ein git log command aus und gibt die Ausgabe zurück
+    :param author: Der author des git repositories
+    :param path: Der absolute Pfad zum git repository
+    :param verbose: ob verbose oder nicht
+    :return: Gib die Ausgabe des git log commands zurück
+    """
+    git_command = git_log_command(author, path)
+
     if verbose:
         print(f"Running command: {' '.join(git_command)}")
 
@@ -65,28 +121,352 @@ def parse_git_log(output):
     return parsed_commits
 
 
+def parse_record(line):
+    """
+    Diese Funktion parst einen einzelnen Commit (eine Zeile) des git log commands
+    :param line: Zeile der Form "author;timestamp offset---END---"
+    :return: Commit als Dictionary oder None für leere Zeilen
+    >>> parse_record('Paul Waldecker;1725264900 +0200---END---\\n')
+    {'author': 'Paul Waldecker', 'date': '1725264900 +0200'}
+    """
+    line = line.strip().removesuffix('---END---')
+    if not line:
+        return None
+    author, date = line.rsplit(';', 1)
+    return {'author': author.strip(), 'date': date.strip()}
+
+
+def stream_git_log(author, path, verbose, revisions=None):
+    """
+    Diese Funktion führt das git log command aus und liefert die Commits einzeln, während git noch läuft. Die Ausgabe
+    wird zeilenweise gelesen, es wird nie die ganze Historie im Speicher gehalten.
+    :param author: Der author des git repositories
+    :param path: Der absolute Pfad zum git repository
+    :param verbose: ob verbose oder nicht (gibt dann alle PROGRESS_EVERY Commits den Fortschritt aus)
+    :param revisions: Commit-Bereich für git log, sonst HEAD
+    :return: Generator für die Commits als Dictionary
+    :raises GitLogError: wenn git log nicht gestartet werden kann oder mit einem Fehler endet
+    """
+    git_command = git_log_command(author, path, revisions)
+
+    if verbose:
+        print(f"Running command: {' '.join(git_command)}")
+
+    try:
+        process = subprocess.Popen(git_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   encoding='utf-8', errors='replace')
+    except Exception as e:
+        raise GitLogError(f"Error: {str(e)}") from e
+
+    with process:
+        count = 0
+        for line in process.stdout:
+            commit = parse_record(line)
+            if commit is None:
+                continue
+            count += 1
+            if verbose and count % PROGRESS_EVERY == 0:
+                print(f"{count} commits read", file=sys.stderr)
+            yield commit
+
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise GitLogError(f"Error running git log: {stderr.strip()}")
+
+    if verbose:
+        print(f"{count} commits read", file=sys.stderr)
+
+
+def weekday_hour(date):
+    """
+    Diese Funktion berechnet Wochentag und Stunde aus einem Datum der Form "timestamp offset" (Unix-Zeit und
+    Zeitzone des Autors, wie von git log ausgegeben) nur mit Integer-Arithmetik
+    :param date: Datum als String
+    :return: (Wochentag mit Montag = 0, Stunde) in der Zeitzone des Autors
+    >>> weekday_hour('1725264900 +0200')
+    (0, 10)
+    >>> weekday_hour('0 -0130')
+    (2, 22)
+    """
+    timestamp, offset = date.split()
+    if len(offset) != 5 or offset[0] not in '+-':
+        raise ValueError(f"invalid timezone offset: {offset}")
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    local = int(timestamp) + (seconds if offset[0] == '+' else -seconds)
+    # Der 1.1.1970 war ein Donnerstag (Wochentag 3)
+    return (local // 86400 + 3) % 7, local % 86400 // 3600
+
+
+def commit_key(date):
+    """
+    Diese Funktion bestimmt Wochentag und Stunde eines Commits, über weekday_hour oder für andere Datumsformate
+    (z.B. --date=rfc) mit dateutil
+    :param date: Datum als String
+    :return: (Wochentag, Stunde)
+    >>> commit_key('1725264900 +0200'), commit_key('Mon, 2 Sep 2024 10:15:00 +0200')
+    ((0, 10), (0, 10))
+    """
+    try:
+        return weekday_hour(date)
+    except ValueError:
+        commit_date = parser.parse(date)
+        return commit_date.weekday(), commit_date.hour
+
+
 def calculate_commit_counts(parsed_commits):
     """
     Diese Funktion berechnet die Anzahl der Commits pro Wochentag und Uhrzeit
-    :param parsed_commits: nimmt als Input die bereinigte Ausgabe des git log commands
-    :return: Gib die Anzahl der Commits pro Wochentag und Uhrzeit zurück
+    :param parsed_commits: nimmt als Input die bereinigte Ausgabe des git log commands (Liste oder Generator)
+    :return: Gib die Anzahl der Commits pro Wochentag und Uhrzeit als 7x24 NumPy-Array zurück
+    >>> counts = calculate_commit_counts([{'date': '1725264900 +0200'}, {'date': 'Mon, 2 Sep 2024 10:15:00 +0200'}])
+    >>> counts.shape, int(counts[0, 10]), int(counts.sum())
+    ((7, 24), 2, 2)
+    """
+    # gezählt wird in einer Python-Liste, einzelne Zugriffe auf ein NumPy-Array wären langsamer
+    commit_counts = [0] * (SHAPE[0] * SHAPE[1])
+
+    for commit in parsed_commits:
+        weekday, hour = commit_key(commit['date'])
+        commit_counts[weekday * SHAPE[1] + hour] += 1
+
+    return np.array(commit_counts, dtype=np.int64).reshape(SHAPE)
+
+
+def calculate_author_counts(parsed_commits, authors=None):
+    """
+    Diese Funktion berechnet die Anzahl der Commits pro Wochentag und Uhrzeit für alle authors in einem Durchgang
+    :param parsed_commits: Commits (Liste oder Generator)
+    :param authors: Liste von Mustern (reguläre Ausdrücke wie bei git log --author); None für alle authors
+    :return: Dictionary author -> Anzahl der Commits pro Wochentag und Uhrzeit
+    >>> commits = [{'author': 'Paul', 'date': '1725264900 +0200'}, {'author': 'Anna', 'date': '0 +0000'}]
+    >>> {author: int(counts.sum()) for author, counts in calculate_author_counts(commits).items()}
+    {'Paul': 1, 'Anna': 1}
+    >>> list(calculate_author_counts(commits, ['^P']))
+    ['Paul']
     """
-    commit_counts = {}
+    patterns = [re.compile(author) for author in authors] if authors else None
+    author_counts = {}
+    skipped = set()
 
     for commit in parsed_commits:
-        commit_date = parser.parse(commit['date'])
-        weekday = commit_date.weekday()
-        hour = commit_date.hour
-        key = (weekday, hour)
+        author = commit['author']
+        if author in skipped:
+            continue
+        if author not in author_counts:
+            if patterns is not None and not any(pattern.search(author) for pattern in patterns):
+                skipped.add(author)
+                continue
+            author_counts[author] = [0] * (SHAPE[0] * SHAPE[1])
+        weekday, hour = commit_key(commit['date'])
+        author_counts[author][weekday * SHAPE[1] + hour] += 1
+
+    return {author: np.array(counts, dtype=np.int64).reshape(SHAPE) for author, counts in author_counts.items()}
+
+
+def merge_author_counts(results):
+    """
+    Diese Funktion fasst die Ergebnisse von calculate_author_counts mehrerer Repositories zusammen
+    :param results: Liste von Dictionaries author -> Anzahl der Commits pro Wochentag und Uhrzeit
+    :return: Dictionary author -> Anzahl der Commits pro Wochentag und Uhrzeit, nach author sortiert
+    >>> one = np.ones(SHAPE, dtype=np.int64)
+    >>> merged = merge_author_counts([{'Paul': one}, {'Paul': 2 * one, 'Anna': one}])
+    >>> {author: int(counts[0, 0]) for author, counts in merged.items()}
+    {'Anna': 1, 'Paul': 3}
+    """
+    merged = {}
+    for author_counts in results:
+        for author, commit_counts in author_counts.items():
+            merged[author] = merged[author] + commit_counts if author in merged else commit_counts.copy()
+    return dict(sorted(merged.items()))
+
+
+def repository_author_counts(path, authors=None, verbose=False):
+    """
+    Diese Funktion liest die Historie eines Repositories mit einem einzigen git log (ohne --author) und zählt die
+    Commits für alle authors. Läuft in den Worker-Prozessen von collect_author_counts.
+    :param path: Der Pfad zum git repository
+    :param authors: Liste von Mustern für die authors; None für alle authors
+    :param verbose: ob verbose oder nicht
+    :return: Dictionary author -> Anzahl der Commits pro Wochentag und Uhrzeit
+    """
+    return calculate_author_counts(stream_git_log('', path, verbose), authors)
+
+
+def collect_author_counts(paths, authors=None, jobs=1, verbose=False):
+    """
+    Diese Funktion zählt die Commits pro author über mehrere Repositories, mit jobs Prozessen parallel. Repositories,
+    die nicht gelesen werden können (z.B. ein falscher Pfad), werden mit ihrem Fehler gemeldet und übersprungen; am
+    Ende wird die Anzahl der übersprungenen Repositories ausgegeben.
+    :param paths: Liste der Pfade der git repositories
+    :param authors: Liste von Mustern für die authors; None für alle authors
+    :param jobs: Anzahl der Prozesse
+    :param verbose: ob verbose oder nicht
+    :return: Dictionary author -> Anzahl der Commits pro Wochentag und Uhrzeit
+    """
+    results, failed = [], []
+
+    def collect(path, result):
+        try:
+            results.append(result())
+        except GitLogError as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failed.append(path)
+
+    if jobs <= 1:
+        for path in paths:
+            collect(path, lambda: repository_author_counts(path, authors, verbose))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(repository_author_counts, path, authors, verbose) for path in paths]
+            for path, future in zip(paths, futures):
+                collect(path, future.result)
 
-        if key not in commit_counts:
-            commit_counts[key] = 0
+    if failed:
+        print(f"{len(failed)} von {len(paths)} Repositories übersprungen: {', '.join(failed)}", file=sys.stderr)
+    return merge_author_counts(results)
 
-        commit_counts[key] += 1
 
+def discover_repositories(directory):
+    """
+    Diese Funktion sucht alle git repositories unterhalb eines Verzeichnisses (in Repositories wird nicht weiter
+    gesucht)
+    :param directory: Startverzeichnis
+    :return: sortierte Liste der Pfade
+    """
+    repositories = []
+    for root, dirs, files in os.walk(directory):
+        if '.git' in dirs or '.git' in files:
+            repositories.append(root)
+            dirs.clear()
+        else:
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+    return sorted(repositories)
+
+
+def cache_file(cache_dir, git_dir, author):
+    """
+    Diese Funktion bestimmt die Cache-Datei für ein Repository und einen Author-Filter
+    :param cache_dir: Verzeichnis des Caches
+    :param git_dir: absoluter Pfad des .git Verzeichnisses
+    :param author: Der Author-Filter
+    :return: Pfad der Cache-Datei
+    """
+    key = hashlib.sha1(f"{git_dir}\0{author}".encode('utf-8')).hexdigest()
+    return Path(cache_dir) / f"{key}.json"
+
+
+def load_cache(filename):
+    """
+    Diese Funktion liest eine Cache-Datei
+    :param filename: Pfad der Cache-Datei
+    :return: (zuletzt verarbeiteter Commit, commit_counts) oder (None, leeres Histogramm), wenn es keinen gültigen
+    Cache gibt
+    """
+    try:
+        with open(filename, encoding='utf-8') as file:
+            data = json.load(file)
+        commit_counts = np.array(data['counts'], dtype=np.int64)
+        if commit_counts.shape == SHAPE:
+            return data['head'], commit_counts
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None, np.zeros(SHAPE, dtype=np.int64)
+
+
+def save_cache(filename, head, commit_counts):
+    """
+    Diese Funktion schreibt eine Cache-Datei (über eine temporäre Datei, damit kein halber Cache übrig bleibt)
+    :param filename: Pfad der Cache-Datei
+    :param head: zuletzt verarbeiteter Commit
+    :param commit_counts: Anzahl der Commits pro Wochentag und Uhrzeit
+    """
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    data = {'head': head, 'counts': commit_counts.tolist()}
+    temp = filename.with_suffix(f".{os.getpid()}.tmp")
+    with open(temp, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(temp, filename)
+
+
+def cached_commit_counts(author, path, cache_dir, verbose):
+    """
+    Diese Funktion berechnet die Anzahl der Commits pro Wochentag und Uhrzeit mit einem Cache pro Repository und
+    Author-Filter. Ist der zuletzt verarbeitete Commit noch ein Vorfahre von HEAD, werden nur die neuen Commits
+    (alt..HEAD) gelesen, sonst (z.B. nach einem Rebase) die ganze Historie.
+    :param author: Der author des git repositories
+    :param path: Der Pfad zum git repository
+    :param cache_dir: Verzeichnis des Caches
+    :param verbose: ob verbose oder nicht
+    :return: Anzahl der Commits pro Wochentag und Uhrzeit
+    """
+    git_dir = run_git(path, 'rev-parse', '--absolute-git-dir')
+    head = run_git(path, 'rev-parse', '--verify', '-q', 'HEAD')
+    if git_dir is None or head is None:
+        # kein Repository oder noch keine Commits: ohne Cache weiter, git log meldet den Fehler
+        return calculate_commit_counts(stream_git_log(author, path, verbose))
+
+    filename = cache_file(cache_dir, git_dir, author)
+    last, commit_counts = load_cache(filename)
+    if last == head:
+        if verbose:
+            print(f"Cache is up to date: {filename}")
+        return commit_counts
+
+    if last and run_git(path, 'merge-base', '--is-ancestor', last, head) is not None:
+        if verbose:
+            print(f"Reading commits {last}..{head}")
+        revisions = f"{last}..{head}"
+    else:
+        if verbose and last:
+            print("History was rewritten, reading all commits")
+        revisions, commit_counts = head, np.zeros(SHAPE, dtype=np.int64)
+
+    commit_counts = commit_counts + calculate_commit_counts(stream_git_log(author, path, verbose, revisions))
+
+    save_cache(filename, head, commit_counts)
     return commit_counts
 
 
+def scatter_counts(ax, commit_counts, author):
+    """
+    Diese Funktion zeichnet nur die Punkte und den Titel (die Achsen müssen mit setup_axes vorbereitet sein)
+    :param ax: matplotlib Axes
+    :param commit_counts: Anzahl der Commits pro Wochentag und Uhrzeit (7x24 Array)
+    :param author: Der author von dem die Commits stammen
+    :return: das erzeugte Scatter-Objekt
+    """
+    weekdays, hours = np.nonzero(commit_counts)
+    ax.set_title(f'{author}: {int(commit_counts.sum())} commits')
+    return ax.scatter(hours, weekdays, s=commit_counts[weekdays, hours] * 50, alpha=0.5, color='C0')
+
+
+def draw_counts(ax, commit_counts, author):
+    """
+    Diese Funktion zeichnet die Commit Daten in ein Achsen-Objekt
+    :param ax: matplotlib Axes
+    :param commit_counts: Anzahl der Commits pro Wochentag und Uhrzeit (7x24 Array)
+    :param author: Der author von dem die Commits stammen
+    """
+    scatter_counts(ax, commit_counts, author)
+    setup_axes(ax)
+
+
+def setup_axes(ax):
+    """
+    Diese Funktion beschriftet die Achsen für die Commit Daten
+    :param ax: matplotlib Axes
+    """
+    ax.set_xlabel('Uhrzeit')
+    ax.set_ylabel('Wochentag')
+
+    ax.set_xlim(-0.5, 24)
+    ax.set_ylim(-0.5, 6.5)
+    ax.set_yticks(ticks=[0, 1, 2, 3, 4, 5, 6], labels=['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So'])
+    ax.set_xticks(range(0, 24, 2))
+
+    ax.grid(True)
+
+
 def create_plot(commit_counts, author, filename=None):
     """
     Diese Funktion erstellt ein Plot mit den Commit Daten
@@ -95,28 +475,8 @@ def create_plot(commit_counts, author, filename=None):
     :param filename: in welches File der Plot gespeichert werden soll
     :return: gibt entweder einen Plot als Datei oder als Fernster zurück
     """
-    weekdays = []
-    hours = []
-    sizes = []
-
-    for (weekday, hour), count in commit_counts.items():
-        weekdays.append(weekday)
-        hours.append(hour)
-        sizes.append(count * 50)
-
     plt.figure(figsize=(10, 6), dpi=100)
-    plt.scatter(hours, weekdays, s=sizes, alpha=0.5)
-
-    plt.xlabel('Uhrzeit')
-    plt.ylabel('Wochentag')
-    plt.title(f'{author}: {sum(commit_counts.values())} commits')
-
-    plt.xlim(-0.5, 24)
-    plt.ylim(-0.5, 6.5)
-    plt.yticks(ticks=[0, 1, 2, 3, 4, 5, 6], labels=['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So'])
-    plt.xticks(range(0, 24, 2))
-
-    plt.grid(True)
+    draw_counts(plt.gca(), commit_counts, author)
 
     if filename:
         plt.savefig(filename)
@@ -125,6 +485,96 @@ def create_plot(commit_counts, author, filename=None):
         plt.show()
 
 
+def page_filename(filename, page, pages):
+    """
+    Diese Funktion bestimmt den Dateinamen einer Seite des Rasters; bei nur einer Seite bleibt er unverändert
+    :param filename: gewünschter Dateiname
+    :param page: Nummer der Seite (ab 1)
+    :param pages: Anzahl der Seiten
+    :return: Dateiname der Seite
+    >>> page_filename("grid.png", 1, 1), page_filename("grid.png", 2, 12)
+    ('grid.png', 'grid_02.png')
+    """
+    if pages == 1:
+        return filename
+    path = Path(filename)
+    return str(path.with_name(f"{path.stem}_{page:0{len(str(pages))}d}{path.suffix}"))
+
+
+def create_grid(author_counts, filename=None):
+    """
+    Diese Funktion erstellt Plots mit einem Teilplot pro author in einem Raster. Mehr als GRID_COLUMNS * GRID_ROWS
+    authors werden auf mehrere Seiten (Dateien name_01.png, name_02.png, ...) aufgeteilt.
+    :param author_counts: Dictionary author -> Anzahl der Commits pro Wochentag und Uhrzeit
+    :param filename: in welches File der Plot gespeichert werden soll
+    :return: gibt entweder einen Plot als Datei oder als Fernster zurück
+    """
+    authors = list(author_counts.items())
+    per_page = GRID_COLUMNS * GRID_ROWS
+    pages = math.ceil(len(authors) / per_page)
+    for page in range(pages):
+        page_counts = authors[page * per_page:(page + 1) * per_page]
+        columns = min(GRID_COLUMNS, len(page_counts))
+        rows = math.ceil(len(page_counts) / columns)
+        fig, axes = plt.subplots(rows, columns, figsize=(10 * columns, 6 * rows), dpi=100, squeeze=False)
+        for ax, (author, commit_counts) in zip(axes.flat, page_counts):
+            draw_counts(ax, commit_counts, author)
+        for ax in axes.flat[len(page_counts):]:
+            ax.set_visible(False)
+        fig.tight_layout()
+
+        if filename:
+            fig.savefig(page_filename(filename, page + 1, pages))
+            print(f"Plot gespeichert als: {page_filename(filename, page + 1, pages)}")
+            plt.close(fig)
+    if not filename:
+        plt.show()
+
+
+def author_filename(author):
+    """
+    Diese Funktion bildet aus einem author einen Dateinamen ohne Sonderzeichen. Wurden Zeichen ersetzt, wird ein
+    kurzer Hash des authors angehängt, damit z.B. "Paul X" und "Paul;X" nicht dieselbe Datei überschreiben.
+    :param author: Name des authors
+    :return: Dateiname ohne Endung
+    >>> author_filename('Paul_Waldecker')
+    'Paul_Waldecker'
+    >>> author_filename('Paul X') == author_filename('Paul;X')
+    False
+    >>> author_filename('Paul X').startswith('Paul_X-')
+    True
+    """
+    name = re.sub(r'[^\w.-]+', '_', author)
+    if name == author:
+        return name
+    return f"{name}-{hashlib.sha1(author.encode('utf-8')).hexdigest()[:8]}"
+
+
+def save_author_plots(author_counts, directory, formats=('png',)):
+    """
+    Diese Funktion speichert einen Plot pro author, ohne Fenster (Agg Backend). Es wird nur eine Figure erzeugt und
+    für alle authors wiederverwendet; pro author werden nur die Punkte und der Titel ersetzt.
+    :param author_counts: Dictionary author -> Anzahl der Commits pro Wochentag und Uhrzeit
+    :param directory: Verzeichnis für die Dateien
+    :param formats: Dateiformate, z.B. ('png', 'svg')
+    """
+    plt.switch_backend('Agg')
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    fig, ax = plt.subplots(figsize=(10, 6), dpi=100)
+    setup_axes(ax)
+    try:
+        for author, commit_counts in author_counts.items():
+            points = scatter_counts(ax, commit_counts, author)
+            name = author_filename(author)
+            for fmt in formats:
+                filename = Path(directory) / f"{name}.{fmt}"
+                fig.savefig(filename, format=fmt)
+                print(f"Plot gespeichert als: {filename}")
+            points.remove()
+    finally:
+        plt.close(fig)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="statistik.py by Paul Waldecker -- draws a plot with git log data")
@@ -133,7 +583,22 @@ def main():
     parser.add_argument('-d', '--directory', type=str, default='.',
                         help='The directory of the git repository, default="."')
     parser.add_argument('-f', '--filename', type=str,
-                        help='The filename of the plot. Don\'t save picture if parameter is missing')
+                        help='The filename of the plot. Don\'t save picture if parameter is missing. Grids of more '
+                             f'than {GRID_COLUMNS * GRID_ROWS} authors are split into name_01.png, name_02.png, ...')
+    parser.add_argument('-c', '--cache', type=str,
+                        help='Directory for cached commit counts; only new commits are read when given')
+    parser.add_argument('-r', '--repositories', type=str, nargs='+',
+                        help='Count all authors in these repositories (one git log per repository)')
+    parser.add_argument('-s', '--search', type=str,
+                        help='Count all authors in every git repository below this directory')
+    parser.add_argument('-A', '--authors', type=str, nargs='+',
+                        help='Only these authors (patterns like --author) with --repositories/--search')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Save one plot per author into this directory with --repositories/--search (headless)')
+    parser.add_argument('--formats', type=str, nargs='+', default=['png'],
+                        help='File formats for --output, e.g. png svg, default=png')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of repositories read in parallel, default=1')
     parser.add_argument('-v', '--verbose', action='store_true', help='Increase verbosity')
     parser.add_argument('-q', '--quiet', action='store_true', help='Decrease verbosity')
 
@@ -141,6 +606,22 @@ def main():
 
     verbose = args.verbose and not args.quiet
 
+    if args.repositories or args.search:
+        paths = (args.repositories or []) + (discover_repositories(args.search) if args.search else [])
+        if verbose:
+            print(f"Git repositories: {', '.join(paths)}")
+        author_counts = collect_author_counts(paths, args.authors, args.jobs, verbose)
+
+        if not author_counts:
+            print("Keine Commits gefunden.", file=sys.stderr)
+            sys.exit(1)
+
+        if args.output:
+            save_author_plots(author_counts, args.output, args.formats)
+        else:
+            create_grid(author_counts, args.filename)
+        return
+
     if verbose:
         print(f"Git repository: {args.directory}")
         print(f"Author: {args.author}")
@@ -149,15 +630,19 @@ def main():
         else:
             print("Plot will be displayed.")
 
-    output = run_git_log(args.author, args.directory, verbose)
+    try:
+        if args.cache:
+            commit_counts = cached_commit_counts(args.author, args.directory, args.cache, verbose)
+        else:
+            commit_counts = calculate_commit_counts(stream_git_log(args.author, args.directory, verbose))
+    except GitLogError as e:
+        print(e)
+        sys.exit(1)
 
-    if not output:
+    if not commit_counts.any():
         print("Keine Commits gefunden.", file=sys.stderr)
         sys.exit(1)
 
-    parsed_commits = parse_git_log(output)
-    commit_counts = calculate_commit_counts(parsed_commits)
-
     create_plot(commit_counts, args.author or "Commits", args.filename)
 
 
@@ -8,130 +8,898 @@ __status__ = "Ready to Review"
 """
 import argparse
 import csv
-from typing import List, Tuple
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import warnings
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
 import xml.etree.ElementTree as ET
 
-from matplotlib import pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
 
-def read_csv(file_path: str) -> List[Tuple]:
+# Anzahl der Punkte, die beim Einlesen auf einmal in Spalten umgewandelt werden
+CHUNK_SIZE = 1 << 16
+# Datensatz eines Punktes im binären Cache (.npy)
+RECORD = np.dtype([("time_ms", "<i8"), ("lon", "<f8"), ("lat", "<f8"), ("altitude", "<f8")])
+# Bezugspunkt der Zeitstempel
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# mittlerer Erdradius in Metern für die Haversine-Formel
+EARTH_RADIUS = 6371000.0
+# Fenster (Punkte) für die Glättung der Seehöhe bei der Erkennung von Lift und Abfahrt
+TREND_WINDOW = 15
+# Abschnitte mit weniger Höhenunterschied werden dem vorherigen Abschnitt zugeschlagen
+MIN_VERTICAL = 30.0
+
+@dataclass
+class Track:
+    """
+    Track in Spalten: Zeitstempel (Millisekunden seit 1970, UTC), Länge, Breite und Seehöhe als NumPy-Arrays gleicher
+    Länge. Millisekunden, damit auch Logger mit mehr als einem Punkt pro Sekunde unterscheidbare Zeiten haben.
+    """
+    time_ms: np.ndarray
+    lon: np.ndarray
+    lat: np.ndarray
+    altitude: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "Track":
+        """
+        Leerer Track
+        :return: Track ohne Punkte
+        """
+        return cls(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def concat(cls, tracks: Iterable["Track"]) -> "Track":
+        """
+        Hängt mehrere Tracks (z.B. eingelesene Blöcke) aneinander
+        :param tracks: Tracks
+        :return: ein Track mit allen Punkten
+        """
+        tracks = list(tracks)
+        if not tracks:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(track, name) for track in tracks])
+                     for name in ("time_ms", "lon", "lat", "altitude")))
+
+    def __len__(self) -> int:
+        return len(self.time_ms)
+
+    def __getitem__(self, index) -> "Track":
+        """
+        Auswahl von Punkten über eine boolesche Maske, ein Index-Array oder einen Slice
+        :param index: Maske, Indizes oder Slice
+        :return: neuer Track mit den ausgewählten Punkten
+        """
+        return Track(self.time_ms[index], self.lon[index], self.lat[index], self.altitude[index])
+
+    def point(self, i: int) -> Tuple:
+        """
+        Einzelner Punkt als Tupel wie in den Ein- und Ausgabedateien
+        :param i: Index des Punktes
+        :return: Tupel mit (timestamp, lon, lat, altitude)
+        """
+        return str(format_times(self.time_ms[[i]])[0]), float(self.lon[i]), float(self.lat[i]), float(self.altitude[i])
+
+def parse_times(timestamps) -> np.ndarray:
+    """
+    Wandelt ISO-8601-Zeitstempel in Millisekunden seit 1970 (UTC) um. Zeitstempel ohne Zeitzone oder mit Z werden
+    vektorisiert umgewandelt, andere Zeitzonen einzeln mit datetime.
+    :param timestamps: Zeitstempel als Strings
+    :return: int64-Array
+    >>> parse_times(['1970-01-01T00:01:00Z', '2024-01-10T09:00:00.200Z']).tolist()
+    [60000, 1704877200200]
+    >>> parse_times(['2024-01-10T10:00:00.5+01:00']).tolist()
+    [1704877200500]
+    """
+    strings = np.asarray(timestamps, dtype=str)
+    try:
+        # NumPy warnt bei Zeitzonen-Offsets nur; die werden hier wie ungültige Werte einzeln behandelt
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", UserWarning)
+            return np.char.rstrip(strings, "Z").astype("datetime64[ms]").astype(np.int64)
+    except (ValueError, UserWarning):
+        times = []
+        for timestamp in strings:
+            moment = datetime.fromisoformat(str(timestamp))
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            times.append((moment - EPOCH) // timedelta(milliseconds=1))
+        return np.array(times, dtype=np.int64)
+
+def format_times(times: np.ndarray) -> np.ndarray:
+    """
+    Wandelt Millisekunden seit 1970 in ISO-8601-Zeitstempel (UTC, mit Z) um. Millisekunden werden nur bei Zeitpunkten
+    geschrieben, die nicht auf eine volle Sekunde fallen.
+    :param times: int64-Array
+    :return: Array von Strings
+    >>> format_times(np.array([60000, 1704877200200])).tolist()
+    ['1970-01-01T00:01:00Z', '2024-01-10T09:00:00.200Z']
+    """
+    moments = times.astype("datetime64[ms]")
+    strings = np.where(times % 1000 == 0, np.datetime_as_string(moments, unit="s"),
+                       np.datetime_as_string(moments, unit="ms"))
+    return np.char.add(strings, "Z")
+
+def columns_to_track(rows: np.ndarray) -> Track:
+    """
+    Wandelt eingelesene Zeilen (Strings: timestamp, lon, lat, altitude) in einen Track um
+    :param rows: 2D-Array mit 4 Spalten
+    :return: Track
+    """
+    values = rows[:, 1:4].astype(np.float64)
+    return Track(parse_times(rows[:, 0]), values[:, 0], values[:, 1], values[:, 2])
+
+def csv_chunks(file_path: str, size: int = CHUNK_SIZE) -> Iterator[Track]:
     """
-    Liest ein CSV-File ein und gibt eine Liste von Tupeln zurück
+    Liest ein CSV-File in Blöcken von size Zeilen ein
     :param file_path: Pfad zur CSV-Datei
-    :return: Liste von Tupeln mit (timestamp, lon, lat, altitude)
+    :param size: Zeilen pro Block
+    :return: Generator für Tracks
     """
-    data = []
     with open(file_path, newline='') as csvfile:
-        reader = csv.reader(csvfile, delimiter=';')
-        for row in reader:
-            timestamp = row[0]
-            lon = float(row[1])
-            lat = float(row[2])
-            altitude = float(row[3])
-            data.append((timestamp, lon, lat, altitude))
-    return data
+        while True:
+            with warnings.catch_warnings():
+                # am Dateiende liefert loadtxt ein leeres Array mit Warnung
+                warnings.simplefilter("ignore", UserWarning)
+                rows = np.loadtxt(csvfile, dtype=str, delimiter=';', max_rows=size, ndmin=2)
+            if len(rows) == 0:
+                return
+            yield columns_to_track(rows)
 
-def read_gpx(file_path: str) -> List[Tuple]:
+def iter_gpx(file_path: str) -> Iterator[Tuple]:
     """
-    Liest ein GPX-File ein und gibt eine Liste von Tupeln zurück
+    Liest ein GPX-File mit iterparse ein und liefert die Trackpunkte einzeln. Verarbeitete Elemente werden sofort
+    wieder aus dem Baum entfernt, der Speicherverbrauch hängt also nicht von der Länge des Tracks ab.
     :param file_path: Pfad zur GPX-Datei
-    :return: Liste von Tupeln mit (timestamp, lon, lat, altitude)
-    """
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-    data = []
-    for trkpt in root.findall(".//{*}trkpt"):
-        lon = float(trkpt.get("lon"))
-        lat = float(trkpt.get("lat"))
-        altitude = float(trkpt.find("{*}ele").text)
-        timestamp = trkpt.find("{*}time").text
-        data.append((timestamp, lon, lat, altitude))
-    return data
+    :return: Generator für Tupel mit (timestamp, lon, lat, altitude)
+    """
+    parents = []
+    for event, element in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag.rpartition("}")[2] != "trkpt":
+            continue
+        yield element.find("{*}time").text, element.get("lon"), element.get("lat"), element.find("{*}ele").text
+        # alle bisherigen Kinder des trkseg sind fertig verarbeitet
+        del parents[-1][:]
 
-def filter_by_altitude(data: List[Tuple], min_alt: float, max_alt: float) -> List[Tuple]:
+def gpx_chunks(file_path: str, size: int = CHUNK_SIZE) -> Iterator[Track]:
+    """
+    Liest ein GPX-File (über iter_gpx) in Blöcken von size Punkten ein
+    :param file_path: Pfad zur GPX-Datei
+    :param size: Punkte pro Block
+    :return: Generator für Tracks
+    """
+    rows = []
+    for point in iter_gpx(file_path):
+        rows.append(point)
+        if len(rows) == size:
+            yield columns_to_track(np.array(rows, dtype=str))
+            rows = []
+    if rows:
+        yield columns_to_track(np.array(rows, dtype=str))
+
+def track_chunks(file_path: str, size: int = CHUNK_SIZE) -> Iterator[Track]:
+    """
+    Liest eine CSV- oder GPX-Datei (je nach Endung) in Blöcken ein
+    :param file_path: Pfad zur Datei
+    :param size: Punkte pro Block
+    :return: Generator für Tracks
+    """
+    return csv_chunks(file_path, size) if file_path.endswith(".csv") else gpx_chunks(file_path, size)
+
+def read_csv(file_path: str) -> Track:
+    """
+    Liest ein CSV-File ein
+    :param file_path: Pfad zur CSV-Datei
+    :return: Track
+    """
+    return Track.concat(csv_chunks(file_path))
+
+def read_gpx(file_path: str) -> Track:
+    """
+    Liest ein GPX-File ein
+    :param file_path: Pfad zur GPX-Datei
+    :return: Track
+    """
+    return Track.concat(gpx_chunks(file_path))
+
+def cache_file(cache_dir: Optional[str], file_path: str) -> Path:
+    """
+    Bestimmt die Cache-Datei für eine Eingabedatei. Der Name enthält einen Hash des absoluten Pfads sowie
+    Änderungszeit und Größe der Datei, eine geänderte Datei bekommt also automatisch eine neue Cache-Datei.
+    :param cache_dir: Verzeichnis des Caches, leer oder None für das Verzeichnis der Eingabedatei
+    :param file_path: Pfad zur GPX- oder CSV-Datei
+    :return: Pfad der Cache-Datei
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:16]
+    return Path(cache_dir or path.parent) / f"{path.name}.{key}.{stat.st_mtime_ns}-{stat.st_size}.npy"
+
+def load_cache(filename: Path) -> Optional[Track]:
+    """
+    Lädt eine Cache-Datei über mmap; die Spalten des Tracks sind dann Sichten auf die Datei
+    :param filename: Pfad der Cache-Datei
+    :return: Track oder None, wenn es keinen gültigen Cache gibt
+    """
+    try:
+        records = np.load(filename, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if records.dtype != RECORD or records.ndim != 1:
+        return None
+    return Track(records["time_ms"], records["lon"], records["lat"], records["altitude"])
+
+def save_cache(filename: Path, body: Path, count: int) -> None:
+    """
+    Schreibt eine Cache-Datei aus den bereits binär geschriebenen Datensätzen (über eine temporäre Datei, damit kein
+    halber Cache übrig bleibt) und löscht veraltete Cache-Dateien derselben Eingabedatei
+    :param filename: Pfad der Cache-Datei
+    :param body: Datei mit count Datensätzen im Format RECORD
+    :param count: Anzahl der Datensätze
+    """
+    temp = filename.with_suffix(f".{os.getpid()}.tmp")
+    with open(temp, 'wb') as f, open(body, 'rb') as records:
+        header = {"descr": np.lib.format.dtype_to_descr(RECORD), "fortran_order": False, "shape": (count,)}
+        np.lib.format.write_array_header_1_0(f, header)
+        shutil.copyfileobj(records, f)
+    prefix = filename.name.rsplit(".", 2)[0]
+    for stale in filename.parent.glob(f"{prefix}.*.npy"):
+        if stale != filename:
+            stale.unlink(missing_ok=True)
+    os.replace(temp, filename)
+
+def cached_chunks(file_path: str, cache_dir: Optional[str], size: int = CHUNK_SIZE) -> Iterator[Track]:
+    """
+    Liest eine Datei blockweise aus dem binären Cache (ohne XML/CSV zu parsen) oder, wenn es keinen gibt, aus der
+    Datei selbst und schreibt dabei den Cache
+    :param file_path: Pfad zur GPX- oder CSV-Datei
+    :param cache_dir: Verzeichnis des Caches, leer oder None für das Verzeichnis der Eingabedatei
+    :param size: Punkte pro Block
+    :return: Generator für Tracks
+    """
+    filename = cache_file(cache_dir, file_path)
+    track = load_cache(filename)
+    if track is not None:
+        for i in range(0, len(track), size):
+            yield track[i:i + size]
+        return
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    body = filename.with_suffix(f".{os.getpid()}.body")
+    count = 0
+    try:
+        with open(body, 'wb') as f:
+            for chunk in track_chunks(file_path, size):
+                records = np.empty(len(chunk), dtype=RECORD)
+                for name in RECORD.names:
+                    records[name] = getattr(chunk, name)
+                records.tofile(f)
+                count += len(chunk)
+                yield chunk
+        save_cache(filename, body, count)
+    finally:
+        body.unlink(missing_ok=True)
+
+def altitude_mask(track: Track, min_alt: Optional[float], max_alt: Optional[float]) -> np.ndarray:
+    """
+    Maske der Punkte innerhalb der Seehöhen
+    :param track: Track
+    :param min_alt: Minimale Seehöhe oder None
+    :param max_alt: Maximale Seehöhe oder None
+    :return: boolesches Array
+    """
+    mask = np.ones(len(track), dtype=bool)
+    if min_alt is not None:
+        mask &= track.altitude >= min_alt
+    if max_alt is not None:
+        mask &= track.altitude <= max_alt
+    return mask
+
+def time_mask(track: Track, start: Optional[int], end: Optional[int]) -> np.ndarray:
+    """
+    Maske der Punkte innerhalb eines Zeitraums
+    :param track: Track
+    :param start: erster Zeitpunkt (Millisekunden seit 1970) oder None
+    :param end: letzter Zeitpunkt (Millisekunden seit 1970) oder None
+    :return: boolesches Array
+    """
+    mask = np.ones(len(track), dtype=bool)
+    if start is not None:
+        mask &= track.time_ms >= start
+    if end is not None:
+        mask &= track.time_ms <= end
+    return mask
+
+def bbox_mask(track: Track, bbox: Optional[Tuple[float, float, float, float]]) -> np.ndarray:
+    """
+    Maske der Punkte innerhalb eines Rechtecks
+    :param track: Track
+    :param bbox: (min. Länge, min. Breite, max. Länge, max. Breite) oder None
+    :return: boolesches Array
+    """
+    if bbox is None:
+        return np.ones(len(track), dtype=bool)
+    lon_min, lat_min, lon_max, lat_max = bbox
+    return (track.lon >= lon_min) & (track.lon <= lon_max) & (track.lat >= lat_min) & (track.lat <= lat_max)
+
+def filter_by_altitude(data: Track, min_alt: float, max_alt: float) -> Track:
     """
     Filtert die Daten nach Seehöhe
-    :param data: Liste von Tupeln mit (timestamp, lon, lat, altitude)
+    :param data: Track
     :param min_alt: Minimale Seehöhe
     :param max_alt: Maximale Seehöhe
-    :return: Gefilterte Liste von Tupeln mit (timestamp, lon, lat, altitude)
+    :return: Gefilterter Track
+    """
+    return data[altitude_mask(data, min_alt, max_alt)]
+
+def filter_track(data: Track, args: argparse.Namespace) -> Track:
+    """
+    Wendet alle Filter aus den Argumenten (Seehöhe, Zeitraum, Rechteck) als eine Maske an
+    :param data: Track
+    :param args: Argumente des Programms
+    :return: Gefilterter Track
+    """
+    mask = altitude_mask(data, args.tal, args.spitze)
+    mask &= time_mask(data, args.start, args.end)
+    mask &= bbox_mask(data, args.bbox)
+    return data[mask]
+
+def track_stats(data: Track, stats: dict) -> Track:
+    """
+    Sammelt niedrigsten/höchsten Punkt, Anzahl, Start- und Endpunkt über mehrere Blöcke eines Tracks
+    :param data: Track (ein Block)
+    :param stats: Dictionary, das befüllt wird (min, max, count, first, last)
+    :return: data unverändert
+    """
+    if not stats:
+        stats.update(min=None, max=None, count=0, first=None, last=None)
+    if len(data) == 0:
+        return data
+    low, high = float(data.altitude.min()), float(data.altitude.max())
+    if stats["count"] == 0:
+        stats.update(min=low, max=high, first=data.point(0))
+    else:
+        stats["min"] = min(stats["min"], low)
+        stats["max"] = max(stats["max"], high)
+    stats["count"] += len(data)
+    stats["last"] = data.point(-1)
+    return data
+
+def segment_distances(track: Track) -> np.ndarray:
+    """
+    Entfernungen zwischen aufeinanderfolgenden Punkten (Haversine, ohne Höhenunterschied)
+    :param track: Track
+    :return: Array mit len(track) - 1 Entfernungen in Metern
+    >>> t = Track(np.array([0, 10]), np.array([11.0, 11.0]), np.array([47.0, 47.001]), np.array([1000.0, 1000.0]))
+    >>> segment_distances(t).round(1).tolist()
+    [111.2]
+    """
+    lon, lat = np.radians(track.lon), np.radians(track.lat)
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def segment_speeds(track: Track, distances: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Geschwindigkeit zwischen aufeinanderfolgenden Punkten; Abschnitte ohne Zeitdifferenz haben Geschwindigkeit 0
+    :param track: Track
+    :param distances: bereits berechnete segment_distances oder None
+    :return: Array mit len(track) - 1 Geschwindigkeiten in m/s
+    >>> t = Track(np.array([0, 10000, 10000]), np.zeros(3), np.array([0.0, 0.001, 0.002]), np.zeros(3))
+    >>> segment_speeds(t).round(2).tolist()
+    [11.12, 0.0]
+    """
+    if distances is None:
+        distances = segment_distances(track)
+    dt = np.diff(track.time_ms) / 1000
+    return np.divide(distances, dt, out=np.zeros_like(distances), where=dt > 0)
+
+def vertical(track: Track) -> Tuple[float, float]:
+    """
+    Summe aller Anstiege und aller Abstiege
+    :param track: Track
+    :return: (Aufstieg, Abstieg) in Metern, beide positiv
+    >>> vertical(Track(np.arange(4), np.zeros(4), np.zeros(4), np.array([1000.0, 1010.0, 1005.0, 1020.0])))
+    (25.0, 5.0)
+    >>> vertical(Track(np.arange(2), np.zeros(2), np.zeros(2), np.array([1000.0, 1010.0])))
+    (10.0, 0.0)
+    """
+    diff = np.diff(track.altitude)
+    # + 0.0 macht aus -0.0 (keine Abstiege) eine normale 0.0
+    return float(diff[diff > 0].sum()), float(-diff[diff < 0].sum()) + 0.0
+
+def trend(track: Track, window: int = TREND_WINDOW, min_vertical: float = MIN_VERTICAL) -> np.ndarray:
+    """
+    Richtung der Seehöhe zwischen aufeinanderfolgenden Punkten (1 bergauf, -1 bergab) aus der geglätteten Seehöhe.
+    Abschnitte mit weniger als min_vertical Höhenunterschied übernehmen die Richtung des vorherigen Abschnitts.
+    :param track: Track
+    :param window: Fenster für den gleitenden Mittelwert
+    :param min_vertical: minimaler Höhenunterschied eines Abschnitts in Metern
+    :return: int8-Array mit len(track) - 1 Einträgen
+    >>> alt = np.array([1000, 1100, 1200, 1300, 1290, 1300, 1200, 1100, 1000], dtype=float)
+    >>> trend(Track(np.arange(9), np.zeros(9), np.zeros(9), alt), window=1).tolist()
+    [1, 1, 1, 1, 1, -1, -1, -1]
+    """
+    n = len(track)
+    if n < 2:
+        return np.ones(0, dtype=np.int8)
+    window = max(1, min(window, n))
+    padded = np.pad(track.altitude, (window // 2, window - 1 - window // 2), mode="edge")
+    smooth = np.convolve(padded, np.ones(window) / window, mode="valid")
+    sign = np.sign(np.diff(smooth)).astype(np.int8)
+
+    for _ in range(2):
+        # flache Stellen (0) übernehmen die letzte Richtung davor, am Anfang die erste danach
+        index = np.where(sign != 0, np.arange(len(sign)), -1)
+        np.maximum.accumulate(index, out=index)
+        first = np.flatnonzero(sign)
+        if len(first) == 0:
+            return np.ones(n - 1, dtype=np.int8)
+        sign = np.where(index >= 0, sign[np.maximum(index, 0)], sign[first[0]])
+
+        # zu kleine Abschnitte ausblenden und im zweiten Durchgang auffüllen
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(sign)) + 1))
+        ends = np.concatenate((starts[1:], [len(sign)]))
+        small = np.abs(smooth[ends] - smooth[starts]) < min_vertical
+        if not small.any() or small.all():
+            break
+        sign[np.repeat(small, ends - starts)] = 0
+    return sign
+
+def segments(track: Track, speeds: Optional[np.ndarray] = None, distances: Optional[np.ndarray] = None) -> list:
+    """
+    Teilt den Track in Liftfahrten (bergauf) und Abfahrten (bergab)
+    :param track: Track
+    :param speeds: bereits berechnete segment_speeds oder None
+    :param distances: bereits berechnete segment_distances oder None
+    :return: Liste von Dictionaries (kind, start, end, duration_s, distance_m, vertical_m, max_speed_kmh)
     """
-    filtered_data = []
-    for point in data:
-        altitude = point[3]
-        if (min_alt is None or altitude >= min_alt) and (max_alt is None or altitude <= max_alt):
-            filtered_data.append(point)
-    return filtered_data
+    if len(track) < 2:
+        return []
+    if distances is None:
+        distances = segment_distances(track)
+    if speeds is None:
+        speeds = segment_speeds(track, distances)
+    sign = trend(track)
+    # Abschnitt k reicht von Punkt starts[k] bis Punkt ends[k], benachbarte Abschnitte teilen sich einen Punkt
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sign)) + 1))
+    ends = np.append(starts[1:], len(track) - 1)
+    # Summen je Abschnitt über kumulierte Summen, Maxima über reduceat
+    cumulative = np.concatenate(([0.0], np.cumsum(distances)))
+    max_speeds = np.maximum.reduceat(speeds, starts)
+    starts_text, ends_text = format_times(track.time_ms[starts]), format_times(track.time_ms[ends])
+    return [{
+        "kind": "lift" if sign[start] > 0 else "run",
+        "start": str(start_text),
+        "end": str(end_text),
+        "duration_s": int(track.time_ms[end] - track.time_ms[start]) // 1000,
+        "distance_m": round(float(cumulative[end] - cumulative[start]), 1),
+        "vertical_m": round(float(track.altitude[end] - track.altitude[start]), 1),
+        "max_speed_kmh": round(float(max_speed) * 3.6, 1),
+    } for start, end, start_text, end_text, max_speed in zip(starts, ends, starts_text, ends_text, max_speeds)]
 
-def plot_data(data: List[Tuple], args: argparse.Namespace) -> None:
+def analyze(track: Track) -> dict:
     """
-    Erstellt ein Scatterplot der Daten
-    :param data: Liste von Tupeln mit (timestamp, lon, lat, altitude)
+    Auswertung eines Tracks: Strecke, Dauer, Geschwindigkeiten, Höhenmeter sowie Liftfahrten und Abfahrten
+    :param track: Track
+    :return: Dictionary (JSON-serialisierbar)
+    """
+    distances = segment_distances(track)
+    speeds = segment_speeds(track, distances)
+    ascent, descent = vertical(track)
+    duration_ms = int(track.time_ms[-1] - track.time_ms[0]) if len(track) else 0
+    distance = float(distances.sum())
+    runs = segments(track, speeds, distances)
+    return {
+        "points": len(track),
+        "distance_m": round(distance, 1),
+        "duration_s": duration_ms // 1000,
+        "avg_speed_kmh": round(distance / duration_ms * 3600, 1) if duration_ms else 0.0,
+        "max_speed_kmh": round(float(speeds.max()) * 3.6, 1) if len(speeds) else 0.0,
+        "ascent_m": round(ascent, 1),
+        "descent_m": round(descent, 1),
+        "min_altitude": float(track.altitude.min()) if len(track) else None,
+        "max_altitude": float(track.altitude.max()) if len(track) else None,
+        "lifts": sum(1 for run in runs if run["kind"] == "lift"),
+        "runs": sum(1 for run in runs if run["kind"] == "run"),
+        "segments": runs,
+    }
+
+def save_summary(summary: dict, file_path: str) -> None:
+    """
+    Speichert die Auswertung als JSON (alles) oder CSV (eine Zeile je Liftfahrt/Abfahrt)
+    :param summary: Ergebnis von analyze
+    :param file_path: Pfad zur .json- oder .csv-Datei
+    """
+    if file_path.endswith(".json"):
+        with open(file_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        return
+    with open(file_path, "w", newline='') as f:
+        writer = csv.DictWriter(f, ["kind", "start", "end", "duration_s", "distance_m", "vertical_m", "max_speed_kmh"],
+                                delimiter=';')
+        writer.writeheader()
+        writer.writerows(summary["segments"])
+
+def local_xy(track: Track) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Projiziert die Punkte in ein ebenes Koordinatensystem in Metern (equirektangulär um die mittlere Breite); für die
+    Ausdehnung eines Skigebiets ist der Fehler vernachlässigbar
+    :param track: Track
+    :return: (x, y) in Metern
+    """
+    lat0 = np.radians(track.lat.mean()) if len(track) else 0.0
+    return np.radians(track.lon) * np.cos(lat0) * EARTH_RADIUS, np.radians(track.lat) * EARTH_RADIUS
+
+def douglas_peucker(track: Track, tolerance: float) -> np.ndarray:
+    """
+    Vereinfachung nach Ramer-Douglas-Peucker: behält nur Punkte, die mehr als tolerance Meter von der Verbindung der
+    umgebenden behaltenen Punkte entfernt sind. Die Abstände eines Abschnitts werden auf einmal mit NumPy berechnet.
+    :param track: Track
+    :param tolerance: erlaubte Abweichung in Metern
+    :return: sortierte Indizes der behaltenen Punkte
+    >>> t = Track(np.arange(5), np.array([11.0, 11.001, 11.002, 11.003, 11.004]),
+    ...           np.array([47.0, 47.0, 47.001, 47.0, 47.0]), np.zeros(5))
+    >>> douglas_peucker(t, 10).tolist(), douglas_peucker(t, 200).tolist()
+    ([0, 1, 2, 3, 4], [0, 4])
+    """
+    n = len(track)
+    if n < 3:
+        return np.arange(n)
+    x, y = local_xy(track)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        distances = np.abs(dx * py - dy * px) / length if length > 0 else np.hypot(px, py)
+        i = int(distances.argmax())
+        if distances[i] > tolerance:
+            middle = first + 1 + i
+            keep[middle] = True
+            stack += [(first, middle), (middle, last)]
+    return np.flatnonzero(keep)
+
+def lttb(track: Track, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: teilt die Punkte der Reihe nach in threshold - 2 Eimer und wählt aus jedem den
+    Punkt mit der größten Dreiecksfläche zum zuletzt gewählten Punkt und zum Mittelwert des nächsten Eimers.
+    :param track: Track
+    :param threshold: Anzahl der Punkte im Ergebnis (erster und letzter Punkt bleiben immer erhalten)
+    :return: sortierte Indizes der behaltenen Punkte
+    >>> t = Track(np.arange(5), np.array([11.0, 11.001, 11.002, 11.003, 11.004]),
+    ...           np.array([47.0, 47.0, 47.001, 47.0, 47.0]), np.zeros(5))
+    >>> lttb(t, 3).tolist(), lttb(t, 10).tolist()
+    ([0, 2, 4], [0, 1, 2, 3, 4])
+    """
+    n = len(track)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x, y = local_xy(track)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for k in range(threshold - 2):
+        low, high = edges[k], edges[k + 1]
+        if k + 2 < len(edges):
+            cx, cy = x[high:edges[k + 2]].mean(), y[high:edges[k + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[low:high] - y[a]) - (x[a] - x[low:high]) * (cy - y[a]))
+        a = low + int(area.argmax())
+        selected[k + 1] = a
+    return selected
+
+def simplify(track: Track, method: Tuple[str, float]) -> Track:
+    """
+    Vereinfacht einen Track für Darstellung und Export
+    :param track: Track
+    :param method: ("dp", Toleranz in Metern) oder ("lttb", Anzahl der Punkte), siehe parse_simplify
+    :return: vereinfachter Track
+    """
+    name, value = method
+    return track[douglas_peucker(track, value) if name == "dp" else lttb(track, int(value))]
+
+def plot_data(data: Track, args: argparse.Namespace, out: Optional[str] = None) -> None:
+    """
+    Erstellt ein Scatterplot der Daten. Es wird eine eigene Figure ohne pyplot verwendet (Agg), daher können im
+    Batch-Betrieb beliebig viele Tracks nacheinander in einem Prozess gerendert werden.
+    :param data: Track
     :param args: Argumente des Programms
+    :param out: Ausgabedatei, None für args.out
     """
-    x = [point[1] for point in data]
-    y = [point[2] for point in data]
+    fig = Figure()
+    ax = fig.add_subplot()
+    x = data.lon
+    y = data.lat
     colors = tuple([int(c) / 255 for c in args.dot.split(',')]) if args.dot else (0, 0, 1)
     line_color = tuple([int(c) / 255 for c in args.line.split(',')]) if args.line else (0, 1, 0)
 
-    plt.scatter(x, y, color=[colors], alpha=0.5)
+    ax.scatter(x, y, color=[colors], alpha=0.5)
     if args.connect:
-        plt.plot(x, y, color=line_color, alpha=0.5)
+        ax.plot(x, y, color=line_color, alpha=0.5)
     if args.marker:
-        plt.scatter([x[0], x[-1]], [y[0], y[-1]], color="red", marker="x")
-        plt.annotate('Start', xy=(x[0], y[0]), xytext=(x[0] - 0.005, y[0] + 0.005),
+        ax.scatter([x[0], x[-1]], [y[0], y[-1]], color="red", marker="x")
+        ax.annotate('Start', xy=(x[0], y[0]), xytext=(x[0] - 0.005, y[0] + 0.005),
                      arrowprops=dict(facecolor='blue', shrink=0.05))
-        plt.annotate('End', xy=(x[-1], y[-1]), xytext=(x[-1] + 0.005, y[-1] - 0.005),
+        ax.annotate('End', xy=(x[-1], y[-1]), xytext=(x[-1] + 0.005, y[-1] - 0.005),
                      arrowprops=dict(facecolor='red', shrink=0.05))
 
-    plt.savefig(args.out)
+    fig.savefig(out or args.out)
 
-def save_csv(data, file_path):
+def save_csv(data, file_path, append=False):
     """
     Speichert die Daten in einer CSV-Datei
-    :param data: Liste von Tupeln mit (timestamp, lon, lat, altitude)
+    :param data: Track
     :param file_path: Pfad zur CSV-Datei
+    :param append: an eine bestehende Datei anhängen (für blockweises Schreiben)
     """
-    with open(file_path, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile, delimiter=';')
-        for row in data:
-            writer.writerow(row)
+    rows = np.column_stack([format_times(data.time_ms), data.lon.astype(str), data.lat.astype(str),
+                            data.altitude.astype(str)])
+    with open(file_path, 'a' if append else 'w', newline='') as csvfile:
+        np.savetxt(csvfile, rows, fmt='%s', delimiter=';', newline='\r\n')
 
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """
+    Liest ein Rechteck im Format lon_min,lat_min,lon_max,lat_max
+    :param value: Argument
+    :return: Tupel mit 4 Zahlen
+    >>> parse_bbox("11,47,11.5,47.5")
+    (11.0, 47.0, 11.5, 47.5)
+    """
+    values = tuple(float(v) for v in value.split(','))
+    if len(values) != 4:
+        raise argparse.ArgumentTypeError("bbox needs lon_min,lat_min,lon_max,lat_max")
+    return values
+
+def parse_simplify(value: str) -> Tuple[str, float]:
+    """
+    Liest die Vereinfachung: eine Toleranz in Metern für Douglas-Peucker (z.B. 5 oder 5m) oder lttb:ANZAHL
+    :param value: Argument
+    :return: ("dp", Toleranz) oder ("lttb", Anzahl)
+    >>> parse_simplify("5m"), parse_simplify("lttb:2000")
+    (('dp', 5.0), ('lttb', 2000))
+    """
+    try:
+        if value.startswith("lttb:"):
+            count = int(value[5:])
+            if count >= 3:
+                return "lttb", count
+        elif float(value.removesuffix("m")) >= 0:
+            return "dp", float(value.removesuffix("m"))
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"invalid simplification: {value} (use METRES or lttb:POINTS with POINTS >= 3)")
+
+def parse_time(value: str) -> int:
+    """
+    Liest einen Zeitpunkt im ISO-8601-Format
+    :param value: Argument
+    :return: Millisekunden seit 1970
+    """
+    try:
+        return int(parse_times([value])[0])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {value}")
+
+
+def process_file(infile: str, out: str, analyze_path: Optional[str], args: argparse.Namespace) -> dict:
+    """
+    Liest, filtert und schreibt einen Track (PNG oder CSV) und optional seine Auswertung
+    :param infile: GPX- oder CSV-Datei
+    :param out: Ausgabedatei (.png oder .csv)
+    :param analyze_path: Datei für die Auswertung (.json oder .csv) oder None
+    :param args: Argumente des Programms (Filter, Darstellung, Vereinfachung, Cache)
+    :return: Dictionary mit stats (siehe track_stats), points, output_points und summary (oder None)
+    """
+    # Datei blockweise laden und filtern; CSV wird Block für Block geschrieben, für PNG, Vereinfachung und Auswertung
+    # wird alles gesammelt
+    stats = {}
+    chunks = []
+    stream = out.endswith(".csv") and not args.simplify
+    source = cached_chunks(infile, args.cache) if args.cache is not None else track_chunks(infile)
+    for i, chunk in enumerate(source):
+        chunk = track_stats(filter_track(chunk, args), stats)
+        if stream:
+            save_csv(chunk, out, append=i > 0)
+        if not stream or analyze_path:
+            chunks.append(chunk)
+    data = Track.concat(chunks)
+    # die Auswertung verwendet immer alle Punkte, Plot und CSV die vereinfachten
+    output = simplify(data, args.simplify) if args.simplify else data
+    if out.endswith(".png"):
+        plot_data(output, args, out)
+    elif not stream:
+        save_csv(output, out)
+    summary = analyze(data) if analyze_path else None
+    if summary:
+        save_summary(summary, analyze_path)
+    return {"stats": stats, "points": stats.get("count", 0), "output_points": len(output), "summary": summary}
+
+def batch_files(pattern: str) -> List[str]:
+    """
+    Eingabedateien für den Batch-Betrieb: alle .gpx- und .csv-Dateien eines Verzeichnisses oder eines Glob-Musters
+    (andere Treffer des Musters werden ignoriert)
+    :param pattern: Verzeichnis oder Muster, z.B. "uploads/*.gpx"
+    :return: sortierte Liste von Pfaden
+    """
+    if os.path.isdir(pattern):
+        paths = (str(path) for path in Path(pattern).iterdir())
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    # nur Tracks, keine Cache-Dateien (.npy) oder Auswertungen neben den Eingaben
+    return sorted(path for path in paths if path.endswith((".gpx", ".csv")) and os.path.isfile(path))
+
+def batch_outputs(files: List[str], outdir: str, fmt: str, analyze_suffix: Optional[str]) -> List[Tuple]:
+    """
+    Ausgabedateien für den Batch-Betrieb. Sie behalten den Pfad relativ zum gemeinsamen Verzeichnis der Eingaben
+    und deren Endung (a.gpx -> a.gpx.png, a.csv -> a.csv.png), damit gleichnamige Dateien sich nicht überschreiben.
+    :param files: Eingabedateien
+    :param outdir: Ausgabeverzeichnis
+    :param fmt: "png" oder "csv"
+    :param analyze_suffix: ".json" oder ".csv" für eine Auswertung je Datei (NAME.summary.json), sonst None
+    :return: Liste von (infile, out, analyze_path)
+    :raises ValueError: wenn eine Ausgabedatei eine Eingabedatei oder eine andere Ausgabedatei wäre
+    >>> batch_outputs(["up/a.gpx", "up/a.csv", "up/x/a.gpx"], "out", "png", ".json")[1]
+    ('up/a.csv', 'out/a.csv.png', 'out/a.csv.summary.json')
+    >>> batch_outputs(["up/a.gpx", "up/a.gpx.csv"], "up", "csv", None)
+    Traceback (most recent call last):
+    ...
+    ValueError: Ausgabedatei up/a.gpx.csv überschreibt eine Eingabedatei
+    """
+    if not files:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(infile)) for infile in files])
+    inputs = {os.path.realpath(infile) for infile in files}
+    seen = set()
+    outputs = []
+    for infile in files:
+        name = Path(outdir) / os.path.relpath(os.path.abspath(infile), root)
+        out = f"{name}.{fmt}"
+        analyze_path = f"{name}.summary{analyze_suffix}" if analyze_suffix else None
+        for path in filter(None, (out, analyze_path)):
+            real = os.path.realpath(path)
+            if real in inputs:
+                raise ValueError(f"Ausgabedatei {os.path.normpath(path)} überschreibt eine Eingabedatei")
+            if real in seen:
+                raise ValueError(f"Ausgabedatei {os.path.normpath(path)} wird mehrfach geschrieben")
+            seen.add(real)
+        outputs.append((infile, out, analyze_path))
+    return outputs
+
+def batch_task(task: Tuple) -> Tuple:
+    """
+    Verarbeitet eine Datei im Batch-Betrieb; läuft in den Worker-Prozessen von run_batch, die matplotlib nur einmal
+    importieren. Fehler werden zurückgegeben statt geworfen, damit eine defekte Datei den Batch nicht abbricht.
+    :param task: (infile, out, analyze_path, args)
+    :return: (infile, Laufzeit in Sekunden, Anzahl der Punkte oder None, Fehlermeldung oder None)
+    """
+    infile, out, analyze_path, args = task
+    start = time.perf_counter()
+    try:
+        result = process_file(infile, out, analyze_path, args)
+    except Exception as e:
+        return infile, time.perf_counter() - start, None, f"{type(e).__name__}: {e}"
+    return infile, time.perf_counter() - start, result["points"], None
+
+def run_batch(files: List[str], outdir: str, fmt: str, analyze_suffix: Optional[str], args: argparse.Namespace,
+              jobs: int = 1) -> List[Tuple]:
+    """
+    Verarbeitet viele Dateien, mit jobs > 1 in einem Prozesspool
+    :param files: Eingabedateien
+    :param outdir: Ausgabeverzeichnis, Namen der Ausgabedateien siehe batch_outputs
+    :param fmt: "png" oder "csv"
+    :param analyze_suffix: ".json" oder ".csv" für eine Auswertung je Datei (NAME.summary.json), sonst None
+    :param args: Argumente des Programms
+    :param jobs: Anzahl der Prozesse
+    :return: Ergebnisse von batch_task in der Reihenfolge von files
+    :raises ValueError: siehe batch_outputs; es wird dann keine Datei verarbeitet
+    """
+    tasks = [(infile, out, analyze_path, args)
+             for infile, out, analyze_path in batch_outputs(files, outdir, fmt, analyze_suffix)]
+    for _, out, _, _ in tasks:
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+    if jobs <= 1:
+        return [batch_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(batch_task, tasks))
 
 def main():
     parser = argparse.ArgumentParser(description="skitrack by Paul Waldecker")
-    parser.add_argument("infile", help="Input-Datei (z.B. track.gpx oder track.csv)")
-    parser.add_argument("-o", "--out", help="Zu generierende Datei, z.B. ski.csv oder ski.png")
+    parser.add_argument("infile", help="Input-Datei (z.B. track.gpx oder track.csv); "
+                                       "ein Verzeichnis oder Glob-Muster (z.B. 'uploads/*.gpx') für den Batch-Betrieb")
+    parser.add_argument("-o", "--out", help="Zu generierende Datei, z.B. ski.csv oder ski.png; "
+                                            "im Batch-Betrieb das Ausgabeverzeichnis (a.gpx -> a.gpx.png)")
+    parser.add_argument("-f", "--format", choices=["png", "csv"], default="png",
+                        help="Ausgabeformat im Batch-Betrieb, default=png")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Anzahl der Prozesse im Batch-Betrieb, default=Anzahl der CPUs")
     parser.add_argument("-m", "--marker", action="store_true", help="Sollen der erste und letzte Punkt markiert werden?")
     parser.add_argument("-t", "--tal", type=float, help="Seehöhe des niedrigsten Punktes, der noch ausgewertet werden soll")
     parser.add_argument("-s", "--spitze", type=float, help="Seehöhe des höchsten Punktes, der noch ausgewertet werden soll")
+    parser.add_argument("--start", type=parse_time, help="Erster Zeitpunkt, z.B. 2024-01-10T09:00:00Z")
+    parser.add_argument("--end", type=parse_time, help="Letzter Zeitpunkt, z.B. 2024-01-10T16:00:00Z")
+    parser.add_argument("--bbox", type=parse_bbox, help="Nur Punkte in lon_min,lat_min,lon_max,lat_max")
     parser.add_argument("-d", "--dot", help="RGB color for points, e.g., 128,128,255")
     parser.add_argument("-c", "--connect", action="store_true", help="Connect points with lines")
     parser.add_argument("-l", "--line", help="RGB-Farbe der Linien z.B.: 255,128,255")
+    parser.add_argument("--simplify", type=parse_simplify,
+                        help="Vor Plot/CSV vereinfachen: Toleranz in Metern (Douglas-Peucker) oder lttb:ANZAHL")
+    parser.add_argument("-a", "--analyze", help="Auswertung (Strecke, Höhenmeter, Lift/Abfahrt) als .json oder .csv; "
+                                                "im Batch-Betrieb zählt nur die Endung (NAME.summary.json)")
+    parser.add_argument("--cache", nargs="?", const="",
+                        help="Binärer Cache der eingelesenen Punkte in diesem Verzeichnis (ohne Angabe: neben infile)")
     parser.add_argument("-v", "--verbose", action="store_true", help="Zeigt Details an")
     parser.add_argument("-q", "--quiet", action="store_true", help="keine Textausgabe")
     args = parser.parse_args()
 
-    # Datei basierend auf dem Dateityp laden
-    data = read_csv(args.infile) if args.infile.endswith(".csv") else read_gpx(args.infile)
-    data = filter_by_altitude(data, args.tal, args.spitze)
+    if args.analyze and not args.analyze.endswith((".json", ".csv")):
+        print("Invalid analysis file extension. Only .json or .csv are allowed.")
+        return
+
+    if os.path.isdir(args.infile) or any(c in args.infile for c in "*?["):
+        if not args.out:
+            parser.error("batch mode needs an output directory (-o)")
+        files = batch_files(args.infile)
+        start = time.perf_counter()
+        try:
+            results = run_batch(files, args.out, args.format, args.analyze and Path(args.analyze).suffix, args,
+                                args.jobs)
+        except ValueError as e:
+            parser.error(str(e))
+        failures = [result for result in results if result[3]]
+        if not args.quiet:
+            for infile, seconds, points, error in results:
+                print(f"{infile}: {seconds:.3f} s, " + (f"FEHLER {error}" if error else f"{points} Punkte"))
+            print(f"{len(results) - len(failures)} von {len(results)} Dateien in {time.perf_counter() - start:.2f} s "
+                  f"verarbeitet, {len(failures)} Fehler")
+        if failures:
+            sys.exit(1)
+        return
+
+    if not args.out or not args.out.endswith((".csv", ".png")):
+        print("Invalid output file extension. Only .csv or .png are allowed.")
+        return
+
+    result = process_file(args.infile, args.out, args.analyze, args)
+    stats, summary = result["stats"], result["summary"]
 
     # Ausgabe für verbose
     if args.verbose and not args.quiet:
-        altitudes = [point[3] for point in data]
-        print(f"Niedrigster Punkt: {min(altitudes)}")
-        print(f"Höchster Punkt: {max(altitudes)}")
-        print(f"Anzahl der Wegpunkte: {len(data)}")
+        print(f"Niedrigster Punkt: {stats['min']}")
+        print(f"Höchster Punkt: {stats['max']}")
+        print(f"Anzahl der Wegpunkte: {stats['count']}")
         if args.marker:
-            print(f"Startpunkt: {data[0]}")
-            print(f"Endpunkt: {data[-1]}")
-
-    # Ausgabe basierend auf Dateityp
-    if args.out.endswith(".csv"):
-        save_csv(data, args.out)
-    elif args.out.endswith(".png"):
-        plot_data(data, args)
-    else:
-        print("Invalid output file extension. Only .csv or .png are allowed.")
+            print(f"Startpunkt: {stats['first']}")
+            print(f"Endpunkt: {stats['last']}")
+        if args.simplify:
+            points, output_points = result["points"], result["output_points"]
+            print(f"Vereinfacht: {points} -> {output_points} Punkte "
+                  f"({output_points / points if points else 1:.1%}, Faktor {points / max(output_points, 1):.1f})")
+        if summary:
+            print(f"Strecke: {summary['distance_m'] / 1000:.2f} km in {summary['duration_s'] // 60} min")
+            print(f"Geschwindigkeit: {summary['avg_speed_kmh']} km/h (max. {summary['max_speed_kmh']} km/h)")
+            print(f"Aufstieg/Abstieg: {summary['ascent_m']} m / {summary['descent_m']} m")
+            print(f"Liftfahrten/Abfahrten: {summary['lifts']} / {summary['runs']}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()